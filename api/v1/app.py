@@ -2,9 +2,12 @@
 """
 Main Flask application.
 """
+from collections import OrderedDict
 import os
+import threading
+import time
 from flask import Flask
-from flask import jsonify
+from flask import g, jsonify, request
 from models import storage
 from api.v1.views import app_views
 from flask_cors import CORS  # Import the CORS class
@@ -15,6 +18,137 @@ app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "0.0.0.0"}})
 
 
+class ResponseCache:
+    """
+    LRU cache of GET responses, bounded in bytes and in age
+
+    Each entry keeps the generations of the classes its response was
+    built from (g.generations) and is only served while storage reports
+    the same generations for them. DBStorage reads them from the
+    database, so the commits of other workers invalidate entries too.
+    """
+
+    def __init__(self, size, ttl):
+        """Instantiate a cache of at most size bytes of bodies, each kept
+        for at most ttl seconds"""
+        self.size = size
+        self.ttl = ttl
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """returns the (status, headers, body) stored under key, or None
+        if there is none or it is stale"""
+        with self.__lock:
+            entry = self.__entries.get(key)
+        fresh = False
+        if entry is not None:
+            generations, stored, response = entry
+            # outside the lock: with DBStorage each one is a query
+            fresh = time.monotonic() - stored <= self.ttl and \
+                all(storage.generation(name) == generation
+                    for name, generation in generations.items())
+        with self.__lock:
+            # another thread may have replaced or dropped it meanwhile
+            current = entry is not None and \
+                self.__entries.get(key) is entry
+            if not fresh:
+                if current:
+                    self.__remove(key)
+                self.misses += 1
+                return None
+            if current:
+                self.__entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, generations, status, headers, body):
+        """stores a response under key, evicting the least recently used
+        ones to make room for it"""
+        if len(body) > self.size:
+            return
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            while self.used + len(body) > self.size:
+                self.__remove(next(iter(self.__entries)))
+                self.evictions += 1
+            self.__entries[key] = (generations, time.monotonic(),
+                                   (status, headers, body))
+            self.used += len(body)
+
+    def __remove(self, key):
+        """drops the entry stored under key"""
+        generations, stored, response = self.__entries.pop(key)
+        self.used -= len(response[2])
+
+    def stats(self):
+        """returns the counters of the cache"""
+        with self.__lock:
+            return {"entries": len(self.__entries), "bytes": self.used,
+                    "size": self.size, "ttl": self.ttl, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+cache = ResponseCache(int(os.getenv("HBNB_API_CACHE_SIZE", 64 << 20)),
+                      float(os.getenv("HBNB_API_CACHE_TTL", 60)))
+
+
+def cache_key():
+    """Returns the key the response to the current request is cached by"""
+    return (request.path, tuple(sorted(request.args.items(multi=True))))
+
+
+@app.before_request
+def cached_response():
+    """Serves a GET from the cache while its classes did not change."""
+    if request.method != "GET" or not cache.size:
+        return None
+    cached = cache.get(cache_key())
+    if cached is None:
+        return None
+    g.cached = True
+    status, headers, body = cached
+    response = app.response_class(body, status=status, headers=headers)
+    return response.make_conditional(request)
+
+
+@app.after_request
+def cache_response(response):
+    """Caches a GET response that says which classes it was built from."""
+    generations = g.pop("generations", None)
+    if generations is None or g.get("cached") or \
+            request.method != "GET" or response.status_code != 200 or \
+            not cache.size:
+        return response
+    key = cache_key()
+    headers = [(k, v) for k, v in response.headers.items()
+               if k != "Content-Length"]
+    if not response.is_streamed:
+        cache.put(key, generations, response.status_code, headers,
+                  response.get_data())
+        return response
+
+    def collect(chunks):
+        """yields chunks, caching their concatenation once all are sent"""
+        body, size = [], 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if size <= cache.size:
+                body.append(chunk)
+                size += len(chunk)
+            yield chunk
+        if size <= cache.size:
+            cache.put(key, generations, 200, headers, b"".join(body))
+    response.response = collect(response.response)
+    return response
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
@@ -23,10 +157,27 @@ def not_found(error):
 app.register_blueprint(app_views, url_prefix="/api/v1")
 
 
+@app.route("/api/v1/stats/cache", methods=["GET"], strict_slashes=False)
+def get_cache_stats():
+    """Retrieves the response cache statistics"""
+    return jsonify(cache.stats())
+
+
+@app.after_request
+def close_after_stream(response):
+    """Closes the storage once a streamed body is sent rather than on
+    teardown, which comes first while the body still reads from it."""
+    if response.is_streamed:
+        g.streamed = True
+        response.call_on_close(storage.close)
+    return response
+
+
 @app.teardown_appcontext
 def close_storage(exception):
     """Closes the storage on teardown."""
-    storage.close()
+    if not g.get("streamed"):
+        storage.close()
 
 
 if __name__ == "__main__":
@@ -10,6 +10,7 @@ app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
 
 # Import routes from other files here
 from api.v1.views.amenities import * 
+from api.v1.views.batch import *
 from api.v1.views.cities import *
 from api.v1.views.index import *
 from api.v1.views.places_amenities import *
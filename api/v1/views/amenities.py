@@ -3,6 +3,8 @@
 Amenities view module for the API.
 """
 from api.v1.views import app_views
+from api.v1.views.conditional import object_response
+from api.v1.views.paging import paginate
 from flask import Flask, jsonify, request, abort
 from models.amenity import Amenity
 from models import storage
@@ -13,9 +15,8 @@ def get_amenities():
     """
     Retrieves the list of all Amenity objects.
     """
-    amenities = storage.all(Amenity)
-    amenity_list = [amen.to_dict() for amen in amenities.values()]
-    return jsonify(amenity_list)
+    return paginate(Amenity, lambda limit, after: storage.iter(
+        Amenity, limit=limit, after=after))
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['GET'],
@@ -27,7 +28,7 @@ def get_amenity(amenity_id):
     amenity = storage.get(Amenity, amenity_id)
     if amenity is None:
         abort(404)
-    return jsonify(amenity.to_dict())
+    return object_response(amenity)
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['DELETE'],
@@ -77,7 +78,7 @@ def update_amenity(amenity_id):
 
     for key, value in data.items():
         if key not in ["id", "amenity_id", "created_at", "updated_at"]:
-            setattr(Amenity, key, value)
+            setattr(amenity, key, value)
 
-    storage.save()
+    amenity.save()
     return jsonify(amenity.to_dict()), 200
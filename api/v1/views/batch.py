@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+"""
+Batch endpoints: create, update or delete many objects of a class with a
+single save of the storage.
+"""
+from api.v1.views import app_views
+from datetime import datetime
+from flask import abort, jsonify, request
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+from os import getenv
+
+# the views package star-imports the view modules
+__all__ = ["batch_objects"]
+
+# plural name -> (class, attributes a new object needs, foreign keys and
+# the class they refer to, attributes an update leaves alone)
+resources = {
+    "amenities": (Amenity, ["name"], {}, ["id"]),
+    "cities": (City, ["state_id", "name"], {"state_id": State},
+               ["id", "state_id"]),
+    "places": (Place, ["city_id", "user_id", "name"],
+               {"city_id": City, "user_id": User},
+               ["id", "user_id", "city_id"]),
+    "reviews": (Review, ["place_id", "user_id", "text"],
+                {"place_id": Place, "user_id": User},
+                ["id", "user_id", "place_id"]),
+    "states": (State, ["name"], {}, ["id"]),
+    "users": (User, ["email", "password"], {}, ["id", "email"]),
+}
+
+# integer - most items a batch request may hold
+batch_limit = int(getenv("HBNB_API_BATCH_LIMIT", 10000))
+
+
+def batch_items():
+    """Returns the list of items the body of the request holds."""
+    data = request.get_json(silent=True)
+    if type(data) != list:
+        abort(400, description="Not a JSON list")
+    if len(data) > batch_limit:
+        abort(413, description="More than {} items".format(batch_limit))
+    return data
+
+
+def create_many(cls, required, parents):
+    """Creates an object of cls from every valid item."""
+    results, objs, found = [], [], {}
+    for data in batch_items():
+        if type(data) != dict:
+            results.append({"status": 400, "error": "Not a JSON"})
+            continue
+        missing = [attr for attr in required if not data.get(attr)]
+        if missing:
+            results.append({"status": 400,
+                            "error": "Missing " + missing[0]})
+            continue
+        # most items of an import share their parents: look each up once
+        for attr, parent in parents.items():
+            key = (parent, str(data[attr]))
+            if key not in found:
+                found[key] = storage.get(*key) is not None
+            if not found[key]:
+                results.append({"status": 404, "error": "Not found"})
+                break
+        else:
+            obj = cls(**data)
+            objs.append(obj)
+            results.append({"status": 201, "object": obj})
+    return results, objs
+
+
+def update_many(cls, ignored):
+    """Sets the attributes of every item on the object of cls its id
+    names."""
+    results, objs = [], []
+    now = datetime.utcnow()
+    for data in batch_items():
+        if type(data) != dict:
+            results.append({"status": 400, "error": "Not a JSON"})
+            continue
+        id = data.get("id")
+        obj = storage.get(cls, id) if type(id) == str else None
+        if obj is None:
+            results.append({"status": 404, "error": "Not found"})
+            continue
+        for key, value in data.items():
+            if key not in ignored + ["created_at", "updated_at"]:
+                setattr(obj, key, value)
+        obj.updated_at = now
+        objs.append(obj)
+        results.append({"status": 200, "object": obj})
+    return results, objs
+
+
+def delete_many(cls):
+    """Deletes the objects of cls whose ids the items are."""
+    results, objs = [], []
+    for id in batch_items():
+        obj = storage.get(cls, id) if type(id) == str else None
+        if obj is None:
+            results.append({"status": 404, "error": "Not found"})
+            continue
+        objs.append(obj)
+        results.append({"status": 200, "id": id})
+    storage.delete_many(objs)
+    return results
+
+
+def batch_objects(name):
+    """
+    Creates (POST), updates (PATCH) or deletes (DELETE) the objects listed
+    in the body, saving the storage once for all of them.
+
+    POST takes a list of new objects, PATCH a list of attributes to set
+    that each hold the id of the object, and DELETE a list of ids. The
+    response lists the result of every item in order: its status and the
+    object, or the error that kept it from being applied.
+    """
+    cls, required, parents, ignored = resources[name]
+    if request.method == "DELETE":
+        results = delete_many(cls)
+    else:
+        if request.method == "POST":
+            results, objs = create_many(cls, required, parents)
+        else:
+            results, objs = update_many(cls, ignored)
+        storage.new_many(objs)
+    storage.save()
+    for result in results:
+        if "object" in result:
+            result["object"] = result["object"].to_dict()
+    return jsonify(results), 200
+
+
+for name in resources:
+    app_views.add_url_rule("/{}/batch".format(name), "batch_" + name,
+                           batch_objects, defaults={"name": name},
+                           methods=["POST", "PATCH", "DELETE"],
+                           strict_slashes=False)
@@ -8,6 +8,8 @@ from models import storage
 from models.city import City
 from models.state import State
 from api.v1.views import app_views
+from api.v1.views.conditional import object_response
+from api.v1.views.paging import paginate
 
 
 @app_views.route('/states/<state_id>/cities', methods=['GET'],
@@ -19,9 +21,9 @@ def get_cities(state_id):
     state = storage.get(State, state_id)
     if state is None:
         return abort(404)
-
-    cities = [city.to_dict() for city in state.cities]
-    return jsonify(cities)
+    return paginate(City, lambda limit, after: storage.iter(
+        City, limit=limit, after=after, where={"state_id": state.id}),
+        State)
 
 
 @app_views.route('/cities/<city_id>', methods=['GET'],
@@ -33,7 +35,7 @@ def get_city(city_id):
     city = storage.get(City, city_id)
     if city is None:
         return abort(404)
-    return jsonify(city.to_dict())
+    return object_response(city)
 
 
 @app_views.route('/cities/<city_id>', methods=['DELETE'], strict_slashes=False)
@@ -87,5 +89,5 @@ def update_city(city_id):
         if key not in ["id", "state_id", "created_at", "updated_at"]:
             setattr(city, key, value)
 
-    storage.save()
+    city.save()
     return jsonify(city.to_dict()), 200
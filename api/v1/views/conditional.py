@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Conditional GET support (ETag and Last-Modified) of the API.
+"""
+from datetime import timezone
+import hashlib
+from flask import g, jsonify, make_response, request
+from models import storage, storage_t
+import uuid
+
+# tells the generations counted by this process from those of another;
+# those of DBStorage are shared through the database
+boot = "db" if storage_t == "db" else uuid.uuid4().hex[:8]
+
+
+def etag(*classes):
+    """
+    Returns the ETag of the response to the current request when it only
+    depends on objects of classes: it changes with their generation.
+    The generations are kept in g.generations for the response cache.
+    """
+    g.generations = {cls.__name__: storage.generation(cls)
+                     for cls in classes}
+    parts = [boot] + ["{}.{}".format(name, generation)
+                      for name, generation in g.generations.items()]
+    if request.query_string:
+        parts.append(hashlib.sha1(request.query_string).hexdigest()[:8])
+    return "-".join(parts)
+
+
+def not_modified(tag, last_modified=None):
+    """Returns whether the request already has the version tagged tag,
+    last modified at last_modified."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(tag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= \
+            request.if_modified_since
+    return False
+
+
+def conditional(make, tag, last_modified=None):
+    """
+    Returns the response make() returns, with the ETag tag and the
+    Last-Modified last_modified (a naive UTC datetime) if given, or an
+    empty 304 response without calling make when the request already has
+    that version.
+    """
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    if not_modified(tag, last_modified):
+        response = make_response("", 304)
+    else:
+        response = make_response(make())
+    response.set_etag(tag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+
+def object_response(obj):
+    """Returns the conditional JSON response of obj."""
+    return conditional(lambda: jsonify(obj.to_dict()),
+                       etag(obj.__class__) + "-" + obj.id, obj.updated_at)
@@ -4,7 +4,9 @@ Status route for API.
 """
 
 from api.v1.views import app_views
-from flask import jsonify
+from api.v1.views.conditional import conditional, etag
+from flask import abort, jsonify
+import models
 from models import storage
 from models.amenity import Amenity
 from models.city import City
@@ -23,7 +25,6 @@ def status():
 @app_views.route('/stats', methods=['GET'], strict_slashes=False)
 def get_stats():
     """Retrieves the number of each object type"""
-    stats = {}
     class_names = {
         Amenity: "amenities",
         City: "cities",
@@ -33,7 +34,18 @@ def get_stats():
         User: "users"
     }
 
-    for cls, cls_name_plural in class_names.items():
-        stats[cls_name_plural] = storage.count(cls)
+    def make():
+        """returns the response counting the objects"""
+        stats = {}
+        for cls, cls_name_plural in class_names.items():
+            stats[cls_name_plural] = storage.count(cls)
+        return jsonify(stats)
+    return conditional(make, etag(*class_names))
 
-    return jsonify(stats)
+
+@app_views.route('/stats/pool', methods=['GET'], strict_slashes=False)
+def get_pool_stats():
+    """Retrieves the database connection pool statistics"""
+    if models.storage_t != "db":
+        abort(404)
+    return jsonify(storage.pool_stats())
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""
+Pagination and field projection of the list endpoints.
+"""
+import base64
+from api.v1.views.conditional import conditional, etag
+from flask import Response, abort, json, jsonify, request
+from flask import stream_with_context
+from models.base_model import format_time, parse_time
+from urllib.parse import urlencode
+
+
+def encode_cursor(obj):
+    """Returns the cursor that resumes a listing after obj."""
+    key = format_time(obj.created_at) + "," + obj.id
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns the (created_at, id) pair a cursor stands for."""
+    try:
+        key = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, id = key.split(",", 1)
+        return parse_time(created_at), id
+    except ValueError:
+        abort(400, description="Invalid cursor")
+
+
+def page_args():
+    """
+    Returns the limit and the (created_at, id) cursor of the request,
+    None for those it does not give.
+    """
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            abort(400, description="Invalid limit")
+        if limit < 1:
+            abort(400, description="Invalid limit")
+    after = request.args.get("cursor")
+    if after is not None:
+        after = decode_cursor(after)
+    return limit, after
+
+
+def project(obj, fields):
+    """Returns the dictionary of obj, only the fields of it if given."""
+    d = obj.to_dict()
+    if fields:
+        d = {k: v for k, v in d.items() if k in fields}
+    return d
+
+
+def items(dicts):
+    """Returns the JSON of the list dicts, as jsonify writes it, without
+    its brackets."""
+    return json.dumps(dicts, separators=(",", ":"))[1:-1]
+
+
+def stream(objs, fields, chunk_size=100):
+    """
+    Yields the JSON array of the dictionaries of objs piece by piece,
+    chunk_size objects to a piece.
+    """
+    chunk, sep = [], "["
+    for obj in objs:
+        chunk.append(project(obj, fields))
+        if len(chunk) == chunk_size:
+            yield sep + items(chunk)
+            chunk, sep = [], ","
+    if chunk:
+        yield sep + items(chunk) + "]\n"
+    else:
+        yield "[]\n" if sep == "[" else "]\n"
+
+
+def paginate(cls, fetch, parent=None):
+    """
+    Returns the JSON response listing the objects of cls fetch(limit,
+    after) yields for the limit, cursor and fields arguments of the
+    request, or a 304 response if the listing did not change since the
+    version the request has; the listing also depends on the class
+    parent if given.
+
+    The objects come in (created_at, id) order once limit or cursor is
+    given; when there are more, a Link header points to the next page.
+    fields, a comma separated list of attributes, keeps only those.
+    Without a limit the list is streamed as the objects are serialized
+    rather than built in memory first.
+    """
+    limit, after = page_args()
+    fields = request.args.get("fields")
+    fields = set(fields.split(",")) if fields else None
+
+    def make():
+        """returns the response listing the objects"""
+        if limit is None:
+            return Response(stream_with_context(stream(fetch(None, after),
+                                                       fields)),
+                            mimetype="application/json")
+        # one more than asked for tells whether there is a next page
+        objs = list(fetch(limit + 1, after))
+        headers = {}
+        if len(objs) > limit:
+            objs = objs[:limit]
+            args = request.args.to_dict()
+            args["cursor"] = encode_cursor(objs[-1])
+            url = request.base_url + "?" + urlencode(args)
+            headers["Link"] = '<{}>; rel="next"'.format(url)
+        return jsonify([project(obj, fields) for obj in objs]), 200, headers
+    if request.method not in ("GET", "HEAD"):
+        # the listing depends on the body, which the ETag does not cover
+        return make()
+    return conditional(make, etag(cls, parent) if parent else etag(cls))
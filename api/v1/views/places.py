@@ -3,6 +3,8 @@
 Places view module for the API.
 """
 from api.v1.views import app_views
+from api.v1.views.conditional import object_response
+from api.v1.views.paging import paginate
 from models.city import City
 from flask import Flask, jsonify, request, abort
 from models.place import Place
@@ -21,8 +23,9 @@ def get_places_by_city(city_id):
     city = storage.get(City, city_id)
     if city is None:
         abort(404)
-    place_list = [place.to_dict() for place in city.places]
-    return jsonify(place_list)
+    return paginate(Place, lambda limit, after: storage.iter(
+        Place, limit=limit, after=after, where={"city_id": city.id}),
+        City)
 
 
 @app_views.route('/places/<place_id>', methods=['GET'],
@@ -34,7 +37,7 @@ def get_place(place_id):
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
-    return jsonify(place.to_dict())
+    return object_response(place)
 
 
 @app_views.route('/places/<place_id>', methods=['DELETE'],
@@ -91,7 +94,7 @@ def update_place(place_id):
     for key, value in data.items():
         if key not in ['id', 'user_id', 'city_id', 'created_at', 'updated_at']:
             setattr(place, key, value)
-    storage.save()
+    place.save()
     return jsonify(place.to_dict()), 200
 
 
@@ -107,33 +110,5 @@ def places_search():
     id_states = data.get("states", [])
     id_cities = data.get("cities", [])
     id_amenities = data.get("amenities", [])
-    places = []
-    if id_states == id_cities == []:
-        places = storage.all(Place).values()
-    else:
-        states = [
-            storage.get(State, _id) for _id in id_states
-            if storage.get(State, _id)
-        ]
-        cities = [city for state in states for city in state.cities]
-        cities += [
-            storage.get(City, _id) for _id in id_cities
-            if storage.get(City, _id)
-        ]
-        cities = list(set(cities))
-        places = [place for city in cities for place in city.places]
-
-    amenities = [
-        storage.get(Amenity, _id) for _id in id_amenities
-        if storage.get(Amenity, _id)
-    ]
-
-    response = []
-    for place in places:
-        response.append(place.to_dict())
-        for amenity in amenities:
-            if amenity not in place.amenities:
-                response.pop()
-                break
-
-    return jsonify(response)
+    return paginate(Place, lambda limit, after: storage.search_places(
+        id_states, id_cities, id_amenities, limit=limit, after=after))
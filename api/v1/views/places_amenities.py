@@ -3,6 +3,7 @@
 
 from flask import Flask, jsonify, request, abort
 from api.v1.views import app_views
+from api.v1.views.conditional import conditional, etag
 import models
 from models import storage
 from models.place import Place
@@ -16,13 +17,10 @@ def get_place_amenities(place_id):
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
-
-    if models.storage_t == "db":
-        return jsonify([amenity.to_dict() for amenity in place.amenities])
-    else:
-        return jsonify([
-            storage.get(Amenity, _id).to_dict() for _id in place.amenity_ids
-        ])
+    # linking an amenity changes the place
+    return conditional(lambda: jsonify([amenity.to_dict()
+                                        for amenity in place.amenities]),
+                       etag(Place, Amenity) + "-" + place.id)
 
 
 @app_views.route('/places/<place_id>/amenities/<amenity_id>',
@@ -37,11 +35,13 @@ def delete_place_amenity(place_id, amenity_id):
     if models.storage_t == "db":
         if amenity not in place.amenities:
             abort(404)
+        place.amenities.remove(amenity)
     else:
-        if amenity.id not in place.amenity_id:
+        if amenity.id not in place.amenity_ids:
             abort(404)
-    amenity.delete()
-    storage.save()
+        place.amenity_ids = [_id for _id in place.amenity_ids
+                             if _id != amenity.id]
+    place.save()
 
     return jsonify({}), 200
 
@@ -60,9 +60,9 @@ def link_place_amenity(place_id, amenity_id):
         else:
             place.amenities.append(amenity)
     else:
-        if amenity.id in place.amenity_id:
+        if amenity.id in place.amenity_ids:
             return jsonify(amenity.to_dict())
         else:
-            place.amenity_id.append(amenity.id)
-    storage.save()
+            place.amenities = amenity
+    place.save()
     return jsonify(amenity.to_dict()), 201
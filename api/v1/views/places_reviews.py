@@ -3,6 +3,8 @@
 Reviews view module for the API.
 """
 from api.v1.views import app_views
+from api.v1.views.conditional import object_response
+from api.v1.views.paging import paginate
 from flask import Flask, jsonify, request, abort
 from models import storage
 from models.review import Review
@@ -19,9 +21,9 @@ def get_reviews_by_place(place_id):
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
-    reviews = place.reviews
-    review_list = [review.to_dict() for review in reviews]
-    return jsonify(review_list)
+    return paginate(Review, lambda limit, after: storage.iter(
+        Review, limit=limit, after=after, where={"place_id": place.id}),
+        Place)
 
 
 @app_views.route('/reviews/<review_id>', methods=['GET'],
@@ -33,7 +35,7 @@ def get_review(review_id):
     review = storage.get(Review, review_id)
     if review is None:
         abort(404)
-    return jsonify(review.to_dict())
+    return object_response(review)
 
 
 @app_views.route('/reviews/<review_id>', methods=['DELETE'],
@@ -91,5 +93,5 @@ def update_review(review_id):
         if key not in ['id', 'user_id', 'place_id', 'created_at',
                        'updated_at']:
             setattr(review, key, value)
-    storage.save()
+    review.save()
     return jsonify(review.to_dict()), 200
@@ -7,6 +7,8 @@ from flask import Flask, jsonify, request, abort
 from models import storage
 from models.state import State
 from api.v1.views import app_views
+from api.v1.views.conditional import object_response
+from api.v1.views.paging import paginate
 
 
 @app_views.route('/states', methods=['GET'], strict_slashes=False)
@@ -14,8 +16,8 @@ def get_states():
     """
     Returns the list of all State objects
     """
-    states = [state.to_dict() for state in storage.all(State).values()]
-    return jsonify(states)
+    return paginate(State, lambda limit, after: storage.iter(
+        State, limit=limit, after=after))
 
 
 @app_views.route('/states/<string:state_id>', methods=['GET'],
@@ -28,7 +30,7 @@ def get_state(state_id):
     if state is None:
         return abort(404)
     else:
-        return jsonify(state.to_dict())
+        return object_response(state)
 
 
 @app_views.route('/states/<string:state_id>', methods=['DELETE'],
@@ -79,5 +81,5 @@ def update_state(state_id):
     for key, value in data.items():
         setattr(state, key, value)
 
-    storage.save()
+    state.save()
     return jsonify(state.to_dict()), 200
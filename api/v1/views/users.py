@@ -3,6 +3,8 @@
 Users view module for the API.
 """
 from api.v1.views import app_views
+from api.v1.views.conditional import object_response
+from api.v1.views.paging import paginate
 from flask import Flask, jsonify, request, abort
 from models import storage
 from models.user import User
@@ -13,9 +15,8 @@ def get_users():
     """
     Retrieves the list of all User objects.
     """
-    users = storage.all(User)
-    user_list = [user.to_dict() for user in users.values()]
-    return jsonify(user_list)
+    return paginate(User, lambda limit, after: storage.iter(
+        User, limit=limit, after=after))
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -26,7 +27,7 @@ def get_user(user_id):
     user = storage.get(User, user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_dict())
+    return object_response(user)
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -74,5 +75,5 @@ def update_user(user_id):
     for key, value in data.items():
         if key not in ['id', 'email', 'created_at', 'updated_at']:
             setattr(user, key, value)
-    storage.save()
+    user.save()
     return jsonify(user.to_dict()), 200
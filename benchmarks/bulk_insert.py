@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""
+Compares loading Reviews into the storage selected by HBNB_TYPE_STORAGE
+with new_many() and with bulk_insert(), each followed by one save()
+
+usage: python3 -m benchmarks.bulk_insert [reviews]
+
+Run it against an empty or test database (HBNB_ENV=test drops it).
+"""
+
+import sys
+import time
+import models
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+def rows(place, user, n_reviews):
+    """yields the attributes of n_reviews Reviews of place by user"""
+    for i in range(n_reviews):
+        yield {"place_id": place.id, "user_id": user.id,
+               "text": "A lovely stay, would come back. {}".format(i)}
+
+
+def main(n_reviews=100000):
+    """loads n_reviews Reviews each way and prints the rows per second"""
+    storage = models.storage
+    state = State(name="California")
+    city = City(state_id=state.id, name="San Francisco")
+    user = User(email="bench@hbnb.io", password="bench")
+    place = Place(city_id=city.id, user_id=user.id, name="Loft")
+    for obj in (state, city, user, place):
+        storage.new(obj)
+        storage.save()
+    start = time.perf_counter()
+    storage.new_many([Review(**row) for row in rows(place, user,
+                                                    n_reviews)])
+    storage.save()
+    elapsed = time.perf_counter() - start
+    print("new_many    {:8.2f} s {:10.0f} rows/s".format(
+        elapsed, n_reviews / elapsed))
+    storage.close()
+    start = time.perf_counter()
+    storage.bulk_insert(Review, rows(place, user, n_reviews))
+    storage.save()
+    elapsed = time.perf_counter() - start
+    print("bulk_insert {:8.2f} s {:10.0f} rows/s".format(
+        elapsed, n_reviews / elapsed))
+    print("reviews     {:8d}".format(storage.count(Review)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+"""
+Measures the per-object cost of building a model from its dictionary
+and of to_dict(), with strptime/strftime and with BaseModel's codec
+
+usage: python3 -m benchmarks.datetime_codec [objects]
+"""
+
+from datetime import datetime
+import sys
+import timeit
+from unittest import mock
+from models import base_model
+from models.review import Review
+
+
+def strptime(string):
+    """the former parser"""
+    return datetime.strptime(string, base_model.time)
+
+
+def strftime(dt):
+    """the former formatter"""
+    return dt.strftime(base_model.time)
+
+
+def main(n_objects=100000):
+    """times Review(**kwargs) and to_dict() with each codec"""
+    kwargs = Review(place_id="p", user_id="u", text="review").to_dict()
+    review = Review(**kwargs)
+    codecs = [("strptime/strftime", strptime, strftime),
+              ("base_model", base_model.parse_time, base_model.format_time)]
+    for name, parse, format in codecs:
+        with mock.patch.object(base_model, "parse_time", parse), \
+                mock.patch.object(base_model, "format_time", format):
+            init = timeit.timeit(lambda: Review(**kwargs), number=n_objects)
+            to_dict = timeit.timeit(review.to_dict, number=n_objects)
+        print("{:<18} __init__ {:6.2f} us  to_dict {:6.2f} us".format(
+            name, init / n_objects * 1e6, to_dict / n_objects * 1e6))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
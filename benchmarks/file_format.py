@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Compares reload() and save() of FileStorage with JSON and binary
+snapshots
+
+usage: python3 -m benchmarks.file_format [objects ...]
+
+Each format runs in its own process, building the objects on reload
+and in lazy mode, for 10^4, 10^5 and 10^6 Reviews unless counts are
+given.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.file_reload import generate
+from snapshot import convert
+
+
+def run(fmt, lazy, path):
+    """reloads then saves path as fmt and prints the seconds each took"""
+    from models.engine.file_storage import FileStorage
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__stamp = None
+    FileStorage._FileStorage__file_path = path
+    FileStorage._FileStorage__format = fmt
+    FileStorage._FileStorage__lazy = lazy == "lazy"
+    storage = FileStorage()
+    start = time.perf_counter()
+    storage.reload()
+    loaded = time.perf_counter()
+    storage.save()
+    saved = time.perf_counter()
+    print("{:<6} {:<5} {:>8} objects {:6.1f} MB  reload {:6.2f} s  "
+          "save {:6.2f} s".format(fmt, lazy, storage.count(),
+                                  os.path.getsize(path) / 2 ** 20,
+                                  loaded - start, saved - loaded))
+
+
+def main(*counts):
+    """generates a snapshot of each size and runs each format on it"""
+    for n_objects in counts or (10 ** 4, 10 ** 5, 10 ** 6):
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "file.json")
+        try:
+            generate(path, n_objects)
+            for fmt in ("json", "binary"):
+                convert(path, path, fmt)
+                for lazy in ("build", "lazy"):
+                    subprocess.run([sys.executable, "-m",
+                                    "benchmarks.file_format", "--run", fmt,
+                                    lazy, path], check=True)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        run(*sys.argv[2:5])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
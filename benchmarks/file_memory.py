@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""
+Measures the memory per object of each class as built instances, as
+lazy record dicts and as CompactRecords rows
+
+usage: python3 -m benchmarks.file_memory [objects per class]
+"""
+
+import gc
+import sys
+import tracemalloc
+import uuid
+from models.engine.file_storage import classes, CompactRecords
+
+parent_ids = [str(uuid.uuid4()) for i in range(100)]
+samples = {
+    "Amenity": {"name": "Wifi"},
+    "City": {"state_id": parent_ids, "name": "San Francisco"},
+    "Place": {"city_id": parent_ids, "user_id": parent_ids,
+              "name": "Lovely place", "description": "Nice " * 20,
+              "number_rooms": 3, "number_bathrooms": 1, "max_guest": 6,
+              "price_by_night": 100, "latitude": 37.77,
+              "longitude": -122.43},
+    "Review": {"place_id": parent_ids, "user_id": parent_ids,
+               "text": "A lovely stay, would come back. " * 4},
+    "State": {"name": "California"},
+    "User": {"email": "user@example.com", "first_name": "Betty",
+             "last_name": "Holberton"}
+}
+
+
+def records(name, n_objects):
+    """yields n_objects (key, to_dict()) pairs of class name as read from
+    file.json, each with its own strings"""
+    for i in range(n_objects):
+        value = {"id": str(uuid.uuid4()), "__class__": name}
+        attrs = {"created_at": "2017-09-28T21:05:54.119427",
+                 "updated_at": "2017-09-28T21:05:54.119572"}
+        attrs.update(samples[name])
+        for attr, sample in attrs.items():
+            if type(sample) is list:
+                sample = sample[i % len(sample)]
+            if type(sample) is str:
+                sample = "".join(list(sample))
+            value[attr] = sample
+        yield "".join([name, ".", value["id"]]), value
+
+
+def measure(build, name, n_objects):
+    """returns the bytes per object held after build(name, n_objects)"""
+    gc.collect()
+    tracemalloc.start()
+    store = build(name, n_objects)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return size / n_objects
+
+
+def built(name, n_objects):
+    """instances in a dict, as FileStorage holds them"""
+    return {key: classes[name](**value)
+            for key, value in records(name, n_objects)}
+
+
+def lazy(name, n_objects):
+    """record dicts in a dict, as HBNB_FILE_LAZY=1 holds them"""
+    return dict(records(name, n_objects))
+
+
+def compact(name, n_objects):
+    """rows in CompactRecords, as HBNB_FILE_COMPACT=1 holds them"""
+    store = CompactRecords(name)
+    for key, value in records(name, n_objects):
+        store[key] = value
+    return store
+
+
+def main(n_objects=100000):
+    """prints bytes per object of each class in each representation"""
+    print("{:<8} {:>8} {:>8} {:>8}".format("class", "built", "lazy",
+                                           "compact"))
+    for name in samples:
+        sizes = [measure(build, name, n_objects)
+                 for build in (built, lazy, compact)]
+        print("{:<8} {:>8.0f} {:>8.0f} {:>8.0f}".format(name, *sizes))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Compares peak memory and time of loading file.json with json.load and
+with FileStorage.reload()
+
+usage: python3 -m benchmarks.file_reload [objects]
+
+Each loader runs in its own process so that ru_maxrss is its own peak.
+"""
+
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+def generate(path, n_objects):
+    """writes a file.json of n_objects Reviews, one at a time"""
+    with open(path, "w") as f:
+        f.write("{")
+        for i in range(n_objects):
+            review_id = str(uuid.uuid4())
+            review = {"id": review_id, "__class__": "Review",
+                      "created_at": "2017-09-28T21:05:54.119427",
+                      "updated_at": "2017-09-28T21:05:54.119572",
+                      "place_id": str(uuid.uuid4()),
+                      "user_id": str(uuid.uuid4()),
+                      "text": "A lovely stay, would come back. " * 4}
+            f.write('{}"Review.{}": {}'.format(", " if i else "",
+                                               review_id, json.dumps(review)))
+        f.write("}")
+
+
+def load(loader, path):
+    """loads path with loader and prints objects, seconds and peak RSS"""
+    from models.engine import file_storage
+    FileStorage = file_storage.FileStorage
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__stamp = None
+    FileStorage._FileStorage__file_path = path
+    storage = FileStorage()
+    start = time.perf_counter()
+    if loader == "json.load":
+        with open(path, "r") as f:
+            jo = json.load(f)
+        for key in jo:
+            value = jo[key]
+            storage.new(file_storage.classes[value["__class__"]](**value))
+    else:
+        storage.reload()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("{:<10} {:>9} objects {:8.2f} s {:10.1f} MB peak RSS".format(
+        loader, storage.count(), elapsed, peak))
+
+
+def main(n_objects=1000000):
+    """generates the file then runs each loader in a child process"""
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "file.json")
+    try:
+        generate(path, n_objects)
+        print("file.json: {:.1f} MB".format(os.path.getsize(path) / 2 ** 20))
+        for loader in ("json.load", "stream"):
+            subprocess.run([sys.executable, "-m", "benchmarks.file_reload",
+                            "--load", loader, path], check=True)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--load"]:
+        load(sys.argv[2], sys.argv[3])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
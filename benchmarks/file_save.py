@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""
+Times FileStorage.save() for each durability mode
+
+usage: python3 -m benchmarks.file_save [objects] [saves]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import models
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def main(n_objects=10000, n_saves=20):
+    """saves a store of n_objects Reviews n_saves times per mode, changing
+    one Review between saves"""
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    try:
+        reviews = [Review(place_id="p", user_id="u", text="review")
+                   for i in range(n_objects)]
+        for review in reviews:
+            models.storage.new(review)
+        models.storage.save()
+        for mode in ("none", "file", "dir"):
+            FileStorage._FileStorage__durability = mode
+            start = time.perf_counter()
+            for i in range(n_saves):
+                reviews[i % n_objects].text = "edited {}".format(i)
+                models.storage.save()
+            elapsed = (time.perf_counter() - start) / n_saves
+            print("durability={:<4} {:8.2f} ms/save".format(mode,
+                                                            elapsed * 1000))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
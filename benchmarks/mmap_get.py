@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+Compares MmapStorage with FileStorage (built and lazy) on a store of
+Reviews: time to open it, random get() and a full iteration, and the
+peak memory of each
+
+usage: python3 -m benchmarks.mmap_get [objects] [gets]
+
+Each storage runs in its own process so that ru_maxrss is its own peak.
+"""
+
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.file_reload import generate
+
+
+def build(path):
+    """writes the data file and the list of ids next to the JSON store
+    at path"""
+    from models.engine.file_storage import iter_snapshot
+    from models.engine.mmap_storage import MmapStorage
+    from models.review import Review
+    MmapStorage._MmapStorage__file_path = path + ".mmap"
+    storage = MmapStorage()
+    with open(path, "rb") as f:
+        storage.bulk_insert(Review, (value for key, value in
+                                     iter_snapshot(f)))
+    storage.save()
+    with open(path + ".ids", "w") as f:
+        json.dump([review.id for review in storage.iter(Review)], f)
+
+
+def run(engine, path, n_gets):
+    """opens the store at path with engine, gets n_gets random Reviews
+    then iterates them all, printing the time each took and peak RSS"""
+    from models.review import Review
+    if engine == "mmap":
+        from models.engine.mmap_storage import MmapStorage
+        MmapStorage._MmapStorage__file_path = path + ".mmap"
+        storage = MmapStorage()
+    else:
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        FileStorage._FileStorage__file_path = path
+        FileStorage._FileStorage__lazy = engine == "lazy"
+        storage = FileStorage()
+    with open(path + ".ids") as f:
+        ids = json.load(f)
+    start = time.perf_counter()
+    storage.reload()
+    opened = time.perf_counter()
+    for id in random.sample(ids, n_gets):
+        storage.get(Review, id)
+    got = time.perf_counter()
+    count = sum(1 for review in storage.iter(Review))
+    iterated = time.perf_counter()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("{:<5} {:>8} objects  open {:6.2f} s  get {:7.1f} us  "
+          "iter {:6.2f} s  {:8.1f} MB peak RSS".format(
+              engine, count, opened - start,
+              (got - opened) / n_gets * 1e6, iterated - got, peak))
+
+
+def main(n_objects=100000, n_gets=1000):
+    """generates the stores then runs each engine in a child process"""
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "file.json")
+    try:
+        generate(path, n_objects)
+        # in a child: the peak RSS of a process outlives exec()
+        subprocess.run([sys.executable, "-m", "benchmarks.mmap_get",
+                        "--build", path], check=True)
+        print("file.json: {:.1f} MB, file.mmap: {:.1f} MB".format(
+            os.path.getsize(path) / 2 ** 20,
+            os.path.getsize(path + ".mmap") / 2 ** 20))
+        for engine in ("file", "lazy", "mmap"):
+            subprocess.run([sys.executable, "-m", "benchmarks.mmap_get",
+                            "--run", engine, path, str(n_gets)], check=True)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--build"]:
+        build(sys.argv[2])
+    elif sys.argv[1:2] == ["--run"]:
+        run(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
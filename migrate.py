@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Copies every object between a JSON file (FileStorage) and the database
+(DBStorage), chunk by chunk
+
+usage: HBNB_TYPE_STORAGE=db ./migrate.py file-to-db|db-to-file
+           [--file file.json] [--chunk rows] [--workers threads]
+
+The database is the one DBStorage connects to through the HBNB_MYSQL_*
+or HBNB_DB_URL environment variables, and must not hold the objects
+yet; db-to-file overwrites the file. The classes of a wave are copied
+in parallel, each wave once the classes it refers to are copied.
+Passwords are not kept in the file, as FileStorage never writes them:
+users copied from a file get an empty one.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import sys
+import threading
+import time
+import models
+from models.engine.file_storage import FileStorage, classes
+
+# the classes copied together, in foreign key order: a City needs its
+# State, a Place its City, User and Amenities, a Review its Place
+waves = [["State", "User", "Amenity"], ["City"], ["Place"], ["Review"]]
+
+# FileStorage is not thread safe: one thread at a time reads or writes it
+file_lock = threading.Lock()
+
+
+class Progress:
+    """Reports the objects copied so far and how fast"""
+
+    def __init__(self, out=sys.stderr):
+        """Instantiate a Progress writing to out"""
+        self.out = out
+        self.done = {}
+        self.start = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def add(self, name, copied, total):
+        """counts copied more objects of class name, out of total"""
+        with self.__lock:
+            self.done[name] = self.done.get(name, 0) + copied
+            elapsed = time.monotonic() - self.start
+            print("{}: {}/{} objects, {:.0f} objects/s".format(
+                name, self.done[name], total,
+                sum(self.done.values()) / max(elapsed, 1e-9)),
+                file=self.out)
+
+    def summary(self):
+        """returns the number of objects copied and the seconds it took"""
+        return sum(self.done.values()), time.monotonic() - self.start
+
+
+def copy_class(source, target, name, chunk, progress):
+    """
+    Copies the objects of class name from source to target, chunk of them
+    at a time in (created_at, id) order; returns the number copied
+    """
+    cls = classes[name]
+    to_db = target is models.storage
+    load = ("amenities",) if name == "Place" and not to_db else ()
+    source_lock = file_lock if to_db else nullcontext()
+    with source_lock:
+        total = source.count(cls)
+    after, copied = None, 0
+    try:
+        while True:
+            with source_lock:
+                objs = list(source.all(cls, load=load, limit=chunk,
+                                       after=after).values())
+            if not objs:
+                break
+            rows = []
+            for obj in objs:
+                row = obj.to_dict()
+                if to_db and name == "User":
+                    row.setdefault("password", "")
+                elif not to_db:
+                    # leave unset columns to the class defaults, as the
+                    # file stores them
+                    row = {k: v for k, v in row.items()
+                           if v is not None and k != "password"}
+                    if name == "Place":
+                        row["amenity_ids"] = [amenity.id
+                                              for amenity in obj.amenities]
+                rows.append(row)
+            if to_db:
+                target.bulk_insert(cls, rows)
+                target.save()
+            else:
+                with file_lock:
+                    target.bulk_insert(cls, rows)
+            after = (objs[-1].created_at, objs[-1].id)
+            copied += len(objs)
+            progress.add(name, len(objs), total)
+    finally:
+        # the database session of this thread
+        models.storage.close()
+    return copied
+
+
+def migrate(source, target, chunk=1000, workers=4, progress=None):
+    """
+    Copies every object of source to target, one of them DBStorage and the
+    other FileStorage; returns the number of objects copied
+    """
+    progress = progress or Progress()
+    copied = 0
+    if "size" not in models.storage.pool_stats():
+        # a single connection (in-memory SQLite): the threads would run
+        # their transactions on it at the same time
+        workers = 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for wave in waves:
+            copied += sum(executor.map(
+                lambda name: copy_class(source, target, name, chunk,
+                                        progress), wave))
+    if target is not models.storage:
+        target.compact()
+    return copied
+
+
+def main(argv=None):
+    """parses the command line and runs the migration"""
+    parser = argparse.ArgumentParser(
+        description="Copy every object between file.json and the database")
+    parser.add_argument("direction", choices=["file-to-db", "db-to-file"])
+    parser.add_argument("--file", default="file.json")
+    parser.add_argument("--chunk", type=int,
+                        default=models.storage.__class__.batch_size
+                        if models.storage_t == "db" else 1000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    if models.storage_t != "db":
+        parser.error("set HBNB_TYPE_STORAGE=db: the models only map to "
+                     "the database tables in db mode")
+    FileStorage._FileStorage__file_path = args.file
+    file_storage = FileStorage()
+    if args.direction == "file-to-db":
+        file_storage.reload()
+        source, target = file_storage, models.storage
+    else:
+        FileStorage._FileStorage__objects = {}
+        source, target = models.storage, file_storage
+    progress = Progress()
+    migrate(source, target, args.chunk, args.workers, progress)
+    copied, elapsed = progress.summary()
+    print("copied {} objects in {:.2f} s ({:.0f} objects/s)".format(
+        copied, elapsed, copied / max(elapsed, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
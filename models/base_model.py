@@ -6,12 +6,36 @@ Contains class BaseModel
 from datetime import datetime
 import models
 from os import getenv
+import re
 import sqlalchemy
 from sqlalchemy import Column, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
+# strings in the time format with all six digits of microseconds
+time_shape = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}", re.ASCII)
+
+
+def parse_time(string):
+    """converts a string in the time format to a datetime"""
+    # fromisoformat is much faster than strptime but also accepts other
+    # ISO 8601 forms (time zones, week dates), so only use it on strings
+    # of exactly the format
+    if len(string) == 26 and time_shape.fullmatch(string):
+        try:
+            return datetime.fromisoformat(string)
+        except ValueError:
+            pass
+    return datetime.strptime(string, time)
+
+
+def format_time(dt):
+    """converts a datetime to a string in the time format"""
+    # isoformat drops a zero microsecond and pads years to 4 digits
+    if dt.microsecond and dt.year >= 1000 and dt.tzinfo is None:
+        return dt.isoformat()
+    return dt.strftime(time)
 
 if models.storage_t == "db":
     Base = declarative_base()
@@ -23,29 +47,38 @@ class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
-        created_at = Column(DateTime, default=datetime.utcnow)
+        # indexed for the (created_at, id) keyset paging of DBStorage
+        created_at = Column(DateTime, default=datetime.utcnow, index=True)
         updated_at = Column(DateTime, default=datetime.utcnow)
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
+        # a new instance is not in storage yet: skip the touch() hook
+        set_attr = setattr if models.storage_t == "db" else object.__setattr__
         if kwargs:
             for key, value in kwargs.items():
                 if key != "__class__":
-                    setattr(self, key, value)
+                    set_attr(self, key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
-            else:
-                self.created_at = datetime.utcnow()
+                set_attr(self, "created_at", parse_time(kwargs["created_at"]))
+            elif type(kwargs.get("created_at", None)) is not datetime:
+                set_attr(self, "created_at", datetime.utcnow())
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
-            else:
-                self.updated_at = datetime.utcnow()
+                set_attr(self, "updated_at", parse_time(kwargs["updated_at"]))
+            elif type(kwargs.get("updated_at", None)) is not datetime:
+                set_attr(self, "updated_at", datetime.utcnow())
             if kwargs.get("id", None) is None:
-                self.id = str(uuid.uuid4())
+                set_attr(self, "id", str(uuid.uuid4()))
         else:
-            self.id = str(uuid.uuid4())
-            self.created_at = datetime.utcnow()
-            self.updated_at = self.created_at
+            set_attr(self, "id", str(uuid.uuid4()))
+            set_attr(self, "created_at", datetime.utcnow())
+            set_attr(self, "updated_at", self.created_at)
+
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute and flags the instance as modified"""
+            super().__setattr__(name, value)
+            models.storage.touch(self)
 
     def __str__(self):
         """String representation of the BaseModel class"""
@@ -62,12 +95,15 @@ class BaseModel:
         """returns a dictionary containing all keys/values of the instance"""
         new_dict = self.__dict__.copy()
         if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
+            new_dict["created_at"] = format_time(new_dict["created_at"])
         if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+            new_dict["updated_at"] = format_time(new_dict["updated_at"])
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
+            # relationships loaded on the instance are not attributes
+            for name in sqlalchemy.inspect(type(self)).relationships.keys():
+                new_dict.pop(name, None)
         # If the storage is not file storage remove password from dict
         if models.storage_t != "db":
             new_dict.pop("password", None)
@@ -3,9 +3,12 @@
 Contains the class DBStorage
 """
 
+from datetime import datetime
+import hashlib
+import itertools
 import models
 from models.amenity import Amenity
-from models.base_model import BaseModel, Base
+from models.base_model import BaseModel, Base, parse_time
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -13,17 +16,102 @@ from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Integer, String, Table
+from sqlalchemy import and_, create_engine, event, func, literal, or_
+from sqlalchemy import select, union_all
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+import threading
+import time
+import uuid
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+if models.storage_t == "db":
+    # number of commits that changed the rows of each class, shared by
+    # every process that uses the database
+    generations = Table("generations", Base.metadata,
+                        Column("name", String(60), primary_key=True),
+                        Column("generation", Integer, nullable=False,
+                               default=0))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+    checkouts = 0
+    timeouts = 0
+    wait_time = 0.0
+    max_wait = 0.0
+    lock = threading.Lock()
+
+    def connect(self):
+        """returns a connection from the pool, timing the wait for it"""
+        start = time.monotonic()
+        try:
+            return super().connect()
+        except TimeoutError:
+            with self.lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.monotonic() - start
+            with self.lock:
+                self.checkouts += 1
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def engine_options(url):
+    """
+    Returns the create_engine() options for url: the pool class and the
+    pool options set through the HBNB_MYSQL_POOL_* environment variables
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and \
+            url.database in (None, "", ":memory:"):
+        # a single connection shared by every thread, or each
+        # connection would get its own empty database
+        return {"poolclass": StaticPool,
+                "connect_args": {"check_same_thread": False}}
+    options = {"poolclass": TimedQueuePool}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    for option, cast in [("pool_size", int), ("max_overflow", int),
+                         ("pool_timeout", float), ("pool_recycle", int),
+                         ("pool_pre_ping", lambda value: value == "1")]:
+        value = getenv("HBNB_MYSQL_" + option.upper())
+        if value is not None:
+            options[option] = cast(value)
+    return options
+
+
+def sqlite_pragmas(dbapi_connection, connection_record):
+    """enforces foreign keys, as MySQL does, and turns on write-ahead
+    logging on a new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
 
 class DBStorage:
-    """interaacts with the MySQL database"""
+    """interaacts with the MySQL (or SQLite) database"""
     __engine = None
     __session = None
+    # integer - rows iter() and search_places() fetch at a time
+    batch_size = int(getenv("HBNB_DB_BATCH_SIZE", 1000))
+    # dictionary - <class name> -> number of rows, kept up to date by
+    # the commits of this process
+    __counts = None
+    # float - time.monotonic() of the last recount of __counts
+    __counted_at = None
+    # float - seconds after which count() recounts the rows, to take in
+    # the writes of other processes
+    count_ttl = float(getenv("HBNB_DB_COUNT_TTL", 60))
+    __lock = threading.Lock()
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -32,29 +120,140 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        HBNB_DB_URL = getenv('HBNB_DB_URL')
+        if not HBNB_DB_URL:
+            HBNB_DB_URL = 'mysql+mysqldb://{}:{}@{}/{}'.format(
+                HBNB_MYSQL_USER, HBNB_MYSQL_PWD, HBNB_MYSQL_HOST,
+                HBNB_MYSQL_DB)
+        self.__engine = create_engine(HBNB_DB_URL,
+                                      **engine_options(HBNB_DB_URL))
+        if self.__engine.dialect.name == "sqlite":
+            event.listen(self.__engine, "connect", sqlite_pragmas)
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    def __load_options(self, cls, load):
+        """
+        Returns the loader options that load the relationships named in
+        load along with cls, one SELECT per relationship instead of one
+        per object; "cities.places" also loads the places of the cities
+        """
+        options = []
+        for path in load:
+            option = None
+            clss = cls
+            for name in path.split("."):
+                attr = getattr(clss, name)
+                option = (selectinload(attr) if option is None
+                          else option.selectinload(attr))
+                clss = attr.property.mapper.class_
+            options.append(option)
+        return options
+
+    def __page(self, query, cls, limit=None, after=None):
+        """
+        Orders query by (created_at, id) and keeps the rows that come
+        after the (created_at, id) pair after, at most limit of them
+        """
+        if limit is None and after is None:
+            return query
+        if after is not None:
+            created_at, id = after
+            query = query.filter(or_(
+                cls.created_at > created_at,
+                and_(cls.created_at == created_at, cls.id > id)))
+        return query.order_by(cls.created_at, cls.id).limit(limit)
+
+    def all(self, cls=None, load=(), limit=None, after=None):
+        """query on the current database session, eagerly loading the
+        relationships named in load
+        Given limit or after, returns only the objects of cls ordered by
+        (created_at, id) that come after the (created_at, id) pair after,
+        at most limit of them"""
         new_dict = {}
         for clss in classes:
             if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
+                query = self.__session.query(classes[clss]).options(
+                    *self.__load_options(classes[clss], load))
+                if cls is not None:
+                    query = self.__page(query, classes[clss], limit, after)
+                objs = query.all()
                 for obj in objs:
                     key = obj.__class__.__name__ + '.' + obj.id
                     new_dict[key] = obj
         return (new_dict)
 
+    def iter(self, cls, limit=None, after=None, where=None):
+        """
+        Yields the objects of cls whose attributes have the values in the
+        dictionary where, fetching them from the database in batches;
+        given limit or after, they come ordered and paged as by all()
+        """
+        cls = classes.get(cls, cls)
+        if cls not in classes.values():
+            return iter(())
+        query = self.__session.query(cls).filter_by(**(where or {}))
+        return self.__page(query, cls, limit, after).yield_per(
+            self.batch_size)
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
 
+    def new_many(self, objs):
+        """add every obj of objs to the current database session"""
+        self.__session.add_all(objs)
+
+    def bulk_insert(self, cls, rows):
+        """
+        Inserts a row of cls for every dictionary of attributes in rows,
+        as cls(**row) takes them, with multi-row INSERTs of batch_size
+        rows that skip the session's unit of work; the amenity_ids of a
+        Place row fill place_amenity. Returns the number of rows
+        inserted; save() commits them.
+        """
+        cls = classes.get(cls, cls)
+        table = cls.__table__
+        place_amenity = Base.metadata.tables["place_amenity"]
+        # every row needs every column for an executemany
+        defaults = {column.name: column.default.arg
+                    if column.default is not None and column.default.is_scalar
+                    else None for column in table.columns}
+        rows = iter(rows)
+        count = 0
+        while True:
+            chunk, links = [], []
+            now = datetime.utcnow()
+            for row in itertools.islice(rows, self.batch_size):
+                values = dict(defaults)
+                values.update((k, v) for k, v in row.items() if k in values)
+                if values["id"] is None:
+                    values["id"] = str(uuid.uuid4())
+                for k in ("created_at", "updated_at"):
+                    if type(values[k]) is str:
+                        values[k] = parse_time(values[k])
+                    elif values[k] is None:
+                        values[k] = now
+                if cls is User and values["password"]:
+                    # hashed as User() hashes it
+                    values["password"] = hashlib.md5(
+                        values["password"].encode()).hexdigest()
+                chunk.append(values)
+                if cls is Place:
+                    links.extend({"place_id": values["id"], "amenity_id": id}
+                                 for id in row.get("amenity_ids") or ())
+            if not chunk:
+                break
+            self.__session.execute(table.insert(), chunk)
+            if links:
+                self.__session.execute(place_amenity.insert(), links)
+            count += len(chunk)
+        if count:
+            # the after_flush hook does not see Core inserts
+            changed = self.__session.info.setdefault("changed", {})
+            changed[cls.__name__] = changed.get(cls.__name__, 0) + count
+        return count
+
     def save(self):
         """commit all changes of the current database session"""
         self.__session.commit()
@@ -64,43 +263,164 @@ class DBStorage:
         if obj is not None:
             self.__session.delete(obj)
 
+    def delete_many(self, objs):
+        """delete every obj of objs from the current database session"""
+        for obj in objs:
+            self.__session.delete(obj)
+
+    @staticmethod
+    def __flushed(session, flush_context):
+        """notes the classes of the objects a flush wrote and how many
+        rows of each it added or removed"""
+        changed = session.info.setdefault("changed", {})
+        for objs, delta in [(session.new, 1), (session.dirty, 0),
+                            (session.deleted, -1)]:
+            for obj in objs:
+                name = obj.__class__.__name__
+                changed[name] = changed.get(name, 0) + delta
+
+    @staticmethod
+    def __committing(session):
+        """counts a change to every class the commit writes, in the same
+        transaction so that other processes see both or neither"""
+        # the last flush of a commit comes after before_commit
+        session.flush()
+        changed = session.info.get("changed")
+        if changed:
+            session.execute(generations.update().where(
+                generations.c.name.in_(sorted(changed))).values(
+                generation=generations.c.generation + 1))
+
+    def __committed(self, session):
+        """applies the row count changes of the commit"""
+        changed = session.info.pop("changed", {})
+        with self.__lock:
+            for name, delta in changed.items():
+                if self.__counts is not None and name in self.__counts:
+                    self.__counts[name] += delta
+
+    @staticmethod
+    def __rolled_back(session, previous_transaction):
+        """forgets the classes written by flushes that were rolled back"""
+        session.info.pop("changed", None)
+
+    def __recount(self):
+        """counts the rows of every table in one round trip"""
+        query = union_all(*[select(literal(name), func.count(clss.id))
+                            for name, clss in classes.items()])
+        counts = dict(self.__session.execute(query).all())
+        # leave out the rows the session flushed but did not commit yet
+        for name, delta in self.__session.info.get("changed", {}).items():
+            counts[name] -= delta
+        with self.__lock:
+            self.__counts = counts
+            self.__counted_at = time.monotonic()
+
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
+        with self.__engine.begin() as connection:
+            # another process may be adding the same rows
+            connection.execute(
+                generations.insert().prefix_with(
+                    "OR IGNORE", dialect="sqlite").prefix_with(
+                    "IGNORE", dialect="mysql"),
+                [{"name": name, "generation": 0} for name in classes])
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        event.listen(sess_factory, "after_flush", self.__flushed)
+        event.listen(sess_factory, "before_commit", self.__committing)
+        event.listen(sess_factory, "after_commit", self.__committed)
+        event.listen(sess_factory, "after_soft_rollback", self.__rolled_back)
         Session = scoped_session(sess_factory)
         self.__session = Session
+        self.__recount()
 
     def close(self):
         """call remove() method on the private session attribute"""
         self.__session.remove()
 
-    def get(self, cls, id):
+    def pool_stats(self):
+        """returns statistics about the connection pool"""
+        pool = self.__engine.pool
+        stats = {"pool": pool.status()}
+        if isinstance(pool, QueuePool):
+            stats.update({"size": pool.size(),
+                          "checked_in": pool.checkedin(),
+                          "checked_out": pool.checkedout(),
+                          "overflow": pool.overflow(),
+                          "timeout": pool.timeout()})
+        if isinstance(pool, TimedQueuePool):
+            stats.update({"checkouts": pool.checkouts,
+                          "timeouts": pool.timeouts,
+                          "wait_time": pool.wait_time,
+                          "max_wait": pool.max_wait})
+        return stats
+
+    def get(self, cls, id, load=()):
         """
         Returns the object based on the class and its ID, or None if not found
+        The relationships named in load are loaded along with it
         """
         if cls not in classes.values():
             return None
 
-        all_cls = models.storage.all(cls)
-        for value in all_cls.values():
-            if (value.id == id):
-                return value
-
-        return None
+        # an object already in the session is returned without a query,
+        # so without its relationships, unless the query is forced
+        return self.__session.get(cls, id,
+                                  options=self.__load_options(cls, load),
+                                  populate_existing=bool(load))
 
-    def count(self, cls=None):
+    def search_places(self, states=(), cities=(), amenities=(),
+                      limit=None, after=None):
         """
-        counts the number of objects in storage
+        Yields the places in the states or cities given, or every place
+        if both are empty, that have all the amenities given, from a
+        single query ordered and paged as by all() and fetched in batches;
+        ids of amenities that do not exist are ignored
         """
-        all_class = classes.values()
-
-        if not cls:
-            count = 0
-            for clas in all_class:
-                count += len(models.storage.all(clas).values())
+        query = self.__session.query(Place)
+        if states or cities:
+            query = query.join(City, Place.city_id == City.id).filter(
+                or_(City.state_id.in_(states), City.id.in_(cities)))
+        if amenities:
+            place_amenity = Base.metadata.tables["place_amenity"]
+            wanted = select(func.count(Amenity.id)).where(
+                Amenity.id.in_(amenities)).scalar_subquery()
+            # a place has all of them when it is linked to as many of
+            # them as exist
+            query = query.outerjoin(place_amenity, and_(
+                place_amenity.c.place_id == Place.id,
+                place_amenity.c.amenity_id.in_(amenities))).group_by(
+                Place.id).having(
+                func.count(place_amenity.c.amenity_id) == wanted)
+        return self.__page(query, Place, limit, after).yield_per(
+            self.batch_size)
 
+    def generation(self, cls=None):
+        """
+        Returns the number of commits that changed rows of cls, or of any
+        class, from the generations table; it grows whenever they change,
+        through this process or another
+        """
+        if cls is None:
+            query = select(func.sum(generations.c.generation))
         else:
-            count = len(models.storage.all(cls).values())
+            cls = cls if isinstance(cls, str) else cls.__name__
+            query = select(generations.c.generation).where(
+                generations.c.name == cls)
+        return self.__session.execute(query).scalar() or 0
 
-        return count
+    def count(self, cls=None):
+        """
+        counts the number of objects in storage, from the row counts
+        kept up to date on commit
+        """
+        if self.__counts is None or \
+                time.monotonic() - self.__counted_at > self.count_ttl:
+            self.__recount()
+        if cls is not None:
+            cls = classes.get(cls, cls)
+            if cls not in classes.values():
+                return 0
+            return self.__counts[cls.__name__]
+        return sum(self.__counts.values())
@@ -3,9 +3,21 @@
 Contains the FileStorage class
 """
 
+import bisect
+from datetime import datetime, timedelta
+import io
+import itertools
 import json
+import marshal
+import os
+from os import getenv
+import re
+import struct
+import sys
+import tempfile
+import threading
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, format_time, parse_time
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -15,6 +27,271 @@ from models.user import User
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# class name -> attribute FileStorage indexes its objects by
+foreign_keys = {"City": "state_id", "Place": "city_id", "Review": "place_id"}
+
+whitespace = re.compile(r"[ \t\n\r]*")
+
+# first bytes of a binary snapshot, followed by a format version byte
+# and, from version 2, the marshal version of its blocks
+magic = b"HBNB"
+# format version of the binary snapshots written
+binary_version = 2
+# marshal version of the blocks written: marshal.dumps() defaults to the
+# latest one of the running Python, which may change with it
+marshal_version = 4
+# class name -> tag standing for it in the binary snapshots written
+tags = {name: tag for tag, name in enumerate(classes)}
+# length of each marshal block of a binary snapshot, 0 after the last
+block_length = struct.Struct("<I")
+# permissions of the snapshots written, those open() would give them
+file_mode = 0o666 & ~os.umask(os.umask(0))
+
+
+def iter_json_object(f, chunk_size=1 << 16):
+    """
+    Yields the (key, value) pairs of the JSON object stored in the file f
+    one at a time, reading it in chunks so that only the pair being
+    decoded is held in memory
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more():
+        """appends the next chunk of f to what is left of buf"""
+        nonlocal buf, pos, eof
+        if eof:
+            raise ValueError("truncated JSON object")
+        chunk = f.read(max(chunk_size, len(buf) - pos))
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def peek():
+        """skips whitespace and returns the next character"""
+        nonlocal pos
+        while True:
+            pos = whitespace.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            more()
+
+    def expect(chars):
+        """consumes and returns the next character, one of chars"""
+        nonlocal pos
+        char = peek()
+        if char not in chars:
+            raise ValueError("expected one of {!r} at offset {}, got {!r}"
+                             .format(chars, pos, char))
+        pos += 1
+        return char
+
+    def decode():
+        """decodes the next JSON value, reading until it is complete"""
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # a value ending with buf may continue in the next chunk
+                if end < len(buf) or eof:
+                    pos = end
+                    return item
+            except ValueError:
+                if eof:
+                    raise
+            more()
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        expect(":")
+        yield key, decode()
+        if expect(",}") == "}":
+            return
+
+
+class CompactRecords:
+    """
+    Holds the records of one class read from disk as tuples of values
+    sharing a tuple of attribute names, which takes a fraction of the
+    memory of a dict per record
+    """
+    epoch = datetime(1970, 1, 1)
+    microsecond = timedelta(microseconds=1)
+
+    def __init__(self, name):
+        """Instantiate an empty CompactRecords for class name"""
+        self.__name = name
+        self.__prefix = name + "."
+        # dictionary - id -> (attribute names, value, value, ...)
+        self.__rows = {}
+        # dictionary - tuple of attribute names -> itself, to share them
+        self.__names = {}
+
+    def __setitem__(self, key, value):
+        """stores the record value under key (<class name>.id)"""
+        names = tuple(k for k in value if k != "id" and k != "__class__")
+        names = self.__names.setdefault(names, names)
+        row = [names]
+        for k in names:
+            v = value[k]
+            if type(v) is str:
+                if k.endswith("_id"):
+                    # foreign keys repeat across records: share one string
+                    v = sys.intern(v)
+                elif k in ("created_at", "updated_at"):
+                    # an int of microseconds is far smaller than the string
+                    try:
+                        v = (parse_time(v) - self.epoch) // self.microsecond
+                    except ValueError:
+                        pass
+            elif type(v) is datetime:
+                v = (v - self.epoch) // self.microsecond
+            row.append(v)
+        self.__rows[key[len(self.__prefix):]] = tuple(row)
+
+    def __record(self, id, row):
+        """returns the record dict of the row stored under id"""
+        value = dict(zip(row[0], row[1:]))
+        for k in ("created_at", "updated_at"):
+            if type(value.get(k)) is int:
+                value[k] = format_time(self.epoch +
+                                       value[k] * self.microsecond)
+        value["id"] = id
+        value["__class__"] = self.__name
+        return value
+
+    def get(self, key, default=None):
+        """returns the record stored under key as a dict"""
+        row = self.__rows.get(key[len(self.__prefix):])
+        if row is None:
+            return default
+        return self.__record(key[len(self.__prefix):], row)
+
+    def pop(self, key, default=None):
+        """removes the record stored under key and returns it as a dict"""
+        row = self.__rows.pop(key[len(self.__prefix):], None)
+        if row is None:
+            return default
+        return self.__record(key[len(self.__prefix):], row)
+
+    def items(self):
+        """yields (key, record dict) pairs"""
+        for id, row in self.__rows.items():
+            yield self.__prefix + id, self.__record(id, row)
+
+    def __iter__(self):
+        """yields the keys of the records"""
+        for id in self.__rows:
+            yield self.__prefix + id
+
+    def __len__(self):
+        """returns the number of records"""
+        return len(self.__rows)
+
+
+def pack_record(value):
+    """
+    Returns the (class tag, id, attributes) record of a binary snapshot
+    for the dict value of an object, with its times as integers of
+    microseconds since the epoch, as CompactRecords keeps them
+    """
+    attrs = {k: v for k, v in value.items()
+             if k != "id" and k != "__class__"}
+    for k in ("created_at", "updated_at"):
+        v = attrs.get(k)
+        if type(v) is str:
+            try:
+                v = parse_time(v)
+            except ValueError:
+                continue
+        if type(v) is datetime:
+            attrs[k] = ((v - CompactRecords.epoch) //
+                        CompactRecords.microsecond)
+    return (tags[value["__class__"]], value["id"], attrs)
+
+
+def blocks(items, size):
+    """yields lists of size items of items, the last one shorter"""
+    items = iter(items)
+    while True:
+        block = list(itertools.islice(items, size))
+        if not block:
+            return
+        yield block
+
+
+def write_binary_object(f, records, block_size=1000):
+    """
+    Writes to the file f, opened in binary mode, the binary snapshot of
+    the records of pack_record(): a header, then the list of the class
+    of each tag and the records, block_size at a time, in marshal blocks
+    each preceded by its length, then a zero length
+    """
+    f.write(magic + bytes([binary_version, marshal_version]))
+    for block in itertools.chain([list(tags)], blocks(records, block_size)):
+        data = marshal.dumps(block, marshal_version)
+        f.write(block_length.pack(len(data)) + data)
+    f.write(block_length.pack(0))
+
+
+def iter_binary_object(f):
+    """
+    Yields the (key, value) pairs of the binary snapshot stored in the
+    file f, opened in binary mode, one block at a time; the values are
+    the dicts a JSON snapshot holds, but with datetimes for the times,
+    which the objects take without parsing them
+    """
+    if f.read(len(magic)) != magic:
+        raise ValueError("not a binary snapshot")
+    version = f.read(1)
+    if not version or version[0] > binary_version:
+        raise ValueError("unsupported binary snapshot version {!r}"
+                         .format(version))
+    if version[0] > 1:
+        # marshal reads the versions before its own, not those after
+        version = f.read(1)
+        if not version or version[0] > marshal.version:
+            raise ValueError("unsupported marshal version {!r}"
+                             .format(version))
+    names = None
+    while True:
+        # one read per block: marshal.load() reads a file in small pieces
+        length = f.read(block_length.size)
+        if len(length) < block_length.size:
+            raise ValueError("truncated binary snapshot")
+        length = block_length.unpack(length)[0]
+        if not length:
+            return
+        data = f.read(length)
+        if len(data) < length:
+            raise ValueError("truncated binary snapshot")
+        block = marshal.loads(data)
+        if names is None:
+            names, block = block, []
+        for tag, id, value in block:
+            for k in ("created_at", "updated_at"):
+                if type(value.get(k)) is int:
+                    value[k] = CompactRecords.epoch + timedelta(
+                        microseconds=value[k])
+            value["id"] = id
+            value["__class__"] = names[tag]
+            yield names[tag] + "." + id, value
+
+
+def iter_snapshot(f):
+    """
+    Yields the (key, value) pairs of the snapshot stored in the file f,
+    opened in binary mode, whether it is binary or JSON
+    """
+    binary = f.read(len(magic)) == magic
+    f.seek(0)
+    if binary:
+        return iter_binary_object(f)
+    return iter_json_object(io.TextIOWrapper(f))
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
@@ -23,82 +300,610 @@ class FileStorage:
     __file_path = "file.json"
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - <class name> -> {<class name>.id: obj}, mirrors __objects
+    __by_class = {}
+    # the __objects dictionary __by_class was last built from
+    __indexed = None
+    # (mtime, size, inode) of __file_path and its log as last loaded/saved
+    __stamp = None
+    # integer - log records kept before compacting, 0 disables the journal
+    __journal = int(getenv("HBNB_FILE_JOURNAL", 0))
+    # integer - number of records currently in the log
+    __log_records = 0
+    # dictionary - <class name>.id -> obj (None if deleted) since last save
+    __pending = {}
+    # dictionary - <class name>.id -> (obj, JSON key, JSON of obj.to_dict())
+    __serialized = {}
+    # dictionary - <class name>.id -> (obj, pack_record(obj.to_dict()))
+    __packed = {}
+    # string - format compact() writes the snapshot in, "json" or
+    # "binary"; reload() reads either
+    __format = getenv("HBNB_FILE_FORMAT", "json")
+    # string - what save() fsyncs: "none", "file" or "dir" (file + directory)
+    __durability = getenv("HBNB_FILE_DURABILITY", "none")
+    # boolean - keep records read from disk as dicts until first accessed
+    __lazy = getenv("HBNB_FILE_LAZY") == "1"
+    # boolean - like __lazy, but keep the records in CompactRecords
+    __compact = getenv("HBNB_FILE_COMPACT") == "1"
+    # dictionary - <class name> -> {<class name>.id: dict read from disk},
+    # records reload() has not turned into objects yet
+    __records = {}
+    # dictionary - <class name> -> {parent id: {<class name>.id: None}},
+    # objects and records by the value of their foreign_keys attribute
+    __children = {}
+    # dictionary - <class name>.id -> parent id it is filed under
+    __links = {}
+    # dictionary - <class name> -> sorted [(created_at, <class name>.id)]
+    # of its objects and records, built by the first paged query
+    __order = {}
+    # dictionary - <class name> -> number of changes made to its objects
+    __generations = {}
+    # held while save() writes the log or the snapshot, as the threads of
+    # the API may save at the same time
+    __lock = threading.RLock()
+
+    def __index(self):
+        """returns the per-class index, rebuilding it and the foreign key
+        index if __objects changed"""
+        if FileStorage.__indexed is not self.__objects:
+            by_class = {}
+            for key, obj in self.__objects.items():
+                name = obj.__class__.__name__
+                by_class.setdefault(name, {})[key] = obj
+            FileStorage.__by_class = by_class
+            FileStorage.__indexed = self.__objects
+            FileStorage.__children = {}
+            FileStorage.__links = {}
+            FileStorage.__order = {}
+            for key, obj in self.__objects.items():
+                self.__link(key, obj.__class__.__name__, obj)
+            for name, records in self.__records.items():
+                if name in foreign_keys:
+                    for key, value in records.items():
+                        self.__link(key, name, value)
+        return FileStorage.__by_class
+
+    def __link(self, key, name, obj):
+        """files key under the parent id held by the foreign key of obj
+        (an object, a record dict or None), and no longer under the
+        parent it was filed under before"""
+        attr = foreign_keys.get(name)
+        if attr is None:
+            return
+        if obj is None:
+            parent = None
+        elif type(obj) is dict:
+            parent = obj.get(attr)
+        else:
+            parent = getattr(obj, attr, None)
+        old = self.__links.get(key)
+        if old == parent:
+            return
+        children = self.__children.setdefault(name, {})
+        if old is not None:
+            siblings = children[old]
+            del siblings[key]
+            if not siblings:
+                del children[old]
+        if parent is None:
+            del self.__links[key]
+        else:
+            self.__links[key] = parent
+            children.setdefault(parent, {})[key] = None
+
+    def __file_stamp(self, path):
+        """returns the (mtime, size, inode) of path, or None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def __log_path(self):
+        """returns the path of the append-only log next to __file_path"""
+        return self.__file_path + ".log"
+
+    def __stamps(self):
+        """returns the stamps of both the snapshot and the log"""
+        return (self.__file_stamp(self.__file_path),
+                self.__file_stamp(self.__log_path()))
+
+    def __sync(self, f):
+        """flushes f to disk unless durability is none"""
+        if self.__durability in ("file", "dir"):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __sync_dir(self):
+        """flushes the directory entries of __file_path to disk if
+        durability is dir"""
+        if self.__durability == "dir":
+            fd = os.open(os.path.dirname(os.path.abspath(self.__file_path)),
+                         os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def __build(self, name, keys=None):
+        """turns the records of class name (only those in keys if given)
+        into objects"""
+        records = self.__records.get(name)
+        if not records:
+            return
+        index = self.__index().setdefault(name, {})
+        for key in list(records) if keys is None else keys:
+            value = records.pop(key, None)
+            if value is not None:
+                obj = classes[name](**value)
+                index[key] = obj
+                self.__objects[key] = obj
 
-    def all(self, cls=None):
-        """returns the dictionary __objects"""
+    def __peek(self, name, key, attr):
+        """returns the attribute attr of the object or record stored under
+        key without building the record"""
+        obj = self.__objects.get(key)
+        if obj is not None:
+            return getattr(obj, attr, None)
+        value = (self.__records.get(name) or {}).get(key) or {}
+        value = value.get(attr)
+        if attr in ("created_at", "updated_at") and type(value) is str:
+            value = parse_time(value)
+        return value
+
+    def __sorted(self, name):
+        """returns the (created_at, key) pairs of class name in order"""
+        index = self.__index()
+        order = self.__order.get(name)
+        if order is None:
+            keys = list(index.get(name, {}))
+            keys += list(self.__records.get(name, {}))
+            order = sorted((self.__peek(name, key, "created_at"), key)
+                           for key in keys)
+            self.__order[name] = order
+        return order
+
+    def __refile(self, name, key, created_at):
+        """files the stored key at created_at in the order of class name,
+        if it is built; an update that keeps created_at costs a search"""
+        order = self.__order.get(name)
+        if order is None:
+            return
+        if type(created_at) is not datetime:
+            # not comparable with the others: sort again when needed
+            del self.__order[name]
+            return
+        i = bisect.bisect_left(order, (created_at, key))
+        if i < len(order) and order[i][1] == key:
+            return
+        for i, pair in enumerate(order):
+            if pair[1] == key:
+                del order[i]
+                break
+        bisect.insort(order, (created_at, key))
+
+    def __page(self, name, order, limit=None, after=None):
+        """
+        Yields the objects of the (created_at, key) pairs of class name
+        in order that come after the cursor after, a (created_at, id)
+        pair, at most limit of them; records are built as they are reached
+        """
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(order,
+                                        (after[0], name + "." + after[1]))
+        stop = None if limit is None else start + limit
+        for created_at, key in order[start:stop]:
+            if key not in self.__objects:
+                self.__build(name, [key])
+            obj = self.__objects.get(key)
+            if obj is not None:
+                yield obj
+
+    def __bump(self, name):
+        """counts a change to an object of class name"""
+        self.__generations[name] = self.__generations.get(name, 0) + 1
+
+    def __load(self, key, value):
+        """adds a record read from disk, building it now unless lazy"""
+        name = value["__class__"]
+        self.__order.pop(name, None)
+        self.__bump(name)
+        if self.__lazy or self.__compact:
+            if self.__objects.pop(key, None) is not None:
+                self.__index().get(name, {}).pop(key, None)
+            if name not in self.__records:
+                self.__records[name] = (CompactRecords(name)
+                                        if self.__compact else {})
+            self.__records[name][key] = value
+            self.__link(key, name, value)
+        else:
+            self.new(classes[name](**value))
+
+    def all(self, cls=None, load=(), limit=None, after=None):
+        """returns the dictionary __objects
+        load is accepted as in DBStorage: relationships are indexed
+        Given limit or after, returns only the objects of cls ordered by
+        (created_at, id) that come after the (created_at, id) pair after,
+        at most limit of them"""
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            if limit is not None or after is not None:
+                objs = self.iter(cls, limit, after)
+                return {cls + "." + obj.id: obj for obj in objs}
+            self.__build(cls)
+            return dict(self.__index().get(cls, {}))
+        for name in list(self.__records):
+            self.__build(name)
         return self.__objects
 
+    def iter(self, cls, limit=None, after=None, where=None):
+        """
+        Yields the objects of cls whose attributes have the values in the
+        dictionary where, building records one at a time as they are
+        reached; given limit or after, they come ordered and paged as by
+        all()
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        index = self.__index()
+        where = dict(where or {})
+        paged = limit is not None or after is not None
+        if paged and not where:
+            order = self.__sorted(name)
+        else:
+            if foreign_keys.get(name) in where:
+                parent = where.pop(foreign_keys[name])
+                keys = list(self.__children.get(name, {}).get(parent, ()))
+            else:
+                keys = list(index.get(name, {}))
+                keys += list(self.__records.get(name, {}))
+            if where:
+                keys = [key for key in keys
+                        if all(self.__peek(name, key, attr) == value
+                               for attr, value in where.items())]
+            if paged:
+                order = sorted((self.__peek(name, key, "created_at"), key)
+                               for key in keys)
+            else:
+                order = [(None, key) for key in keys]
+        return self.__page(name, order, limit, after)
+
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
+            name = obj.__class__.__name__
+            key = name + "." + obj.id
+            index = self.__index().setdefault(name, {})
+            if key in index or key in self.__records.get(name, {}):
+                self.__refile(name, key, obj.created_at)
+            elif name in self.__order:
+                bisect.insort(self.__order[name], (obj.created_at, key))
+            index[key] = obj
+            self.__objects[key] = obj
+            self.__pending[key] = obj
+            self.__bump(name)
+            self.__forget(key)
+            self.__link(key, name, obj)
+            if name in self.__records:
+                self.__records[name].pop(key, None)
+
+    def new_many(self, objs):
+        """sets in __objects every obj of objs, for a single save()"""
+        for obj in objs:
+            self.new(obj)
+
+    def bulk_insert(self, cls, rows):
+        """
+        Adds an object of cls built from every dictionary of attributes in
+        rows, indexing them together rather than one new() at a time;
+        returns the number of objects added. save() writes them.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        cls = classes[name]
+        index = self.__index().setdefault(name, {})
+        records = self.__records.get(name, {})
+        count = 0
+        for row in rows:
+            obj = cls(**row)
+            key = name + "." + obj.id
+            index[key] = obj
             self.__objects[key] = obj
+            self.__pending[key] = obj
+            self.__forget(key)
+            self.__link(key, name, obj)
+            records.pop(key, None)
+            count += 1
+        if count:
+            self.__order.pop(name, None)
+            self.__bump(name)
+        return count
+
+    def touch(self, obj):
+        """flags a stored obj as modified so the next save writes it"""
+        name = obj.__class__.__name__
+        key = name + "." + obj.__dict__.get("id", "")
+        if self.__objects.get(key) is obj:
+            self.__pending[key] = obj
+            self.__forget(key)
+            self.__bump(name)
+            self.__index()
+            self.__link(key, name, obj)
+            self.__refile(name, key, obj.created_at)
+
+    def __forget(self, key):
+        """drops the cached snapshot forms of the object stored under key"""
+        self.__serialized.pop(key, None)
+        self.__packed.pop(key, None)
+
+    def __serialize(self, key, obj):
+        """returns the cached JSON key and value of obj, refreshing them
+        if obj was modified since they were computed"""
+        entry = self.__serialized.get(key)
+        if entry is None or entry[0] is not obj:
+            value = obj if type(obj) is dict else obj.to_dict()
+            # records of a binary snapshot hold datetimes
+            entry = (obj, json.dumps(key),
+                     json.dumps(value, default=format_time))
+            self.__serialized[key] = entry
+        return entry[1], entry[2]
+
+    def __pack(self, key, obj):
+        """returns the cached binary snapshot record of obj, refreshing it
+        if obj was modified since it was computed"""
+        entry = self.__packed.get(key)
+        if entry is None or entry[0] is not obj:
+            value = obj if type(obj) is dict else obj.to_dict()
+            entry = (obj, pack_record(value))
+            self.__packed[key] = entry
+        return entry[1]
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        """serializes __objects to the file (path: __file_path)"""
+        with self.__lock:
+            if (self.__journal and os.path.exists(self.__file_path) and
+                    self.__log_records + len(self.__pending) <=
+                    self.__journal):
+                self.__append_log()
+            else:
+                self.compact()
+            FileStorage.__stamp = self.__stamps()
+
+    def __append_log(self):
+        """appends one record per pending change to the log"""
+        if not self.__pending:
+            return
+        lines = []
+        for key, obj in self.__pending.items():
+            if obj is None:
+                json_key, value = json.dumps(key), "null"
+            else:
+                json_key, value = self.__serialize(key, obj)
+            lines.append('{"key": ' + json_key + ', "value": ' + value +
+                         '}\n')
+        created = not os.path.exists(self.__log_path())
+        with open(self.__log_path(), 'a+b') as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # the last append was torn: start after its tail
+                    lines.insert(0, "\n")
+            f.write("".join(lines).encode())
+            self.__sync(f)
+        if created:
+            self.__sync_dir()
+        FileStorage.__log_records += len(lines)
+        FileStorage.__pending = {}
+
+    def compact(self):
+        """writes every object to __file_path and empties the log"""
+        with self.__lock:
+            if self.__journal:
+                # log first: replaying a complete log over the new snapshot
+                # is harmless if we stop before truncating it
+                self.__append_log()
+            # write aside and rename so a crash never leaves a partial file
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.__file_path) or ".",
+                prefix=os.path.basename(self.__file_path) + ".",
+                suffix=".tmp")
+            try:
+                with open(fd, 'wb') as f:
+                    os.chmod(tmp_path, file_mode)
+                    if self.__format == "binary":
+                        self.__write_binary(f)
+                    else:
+                        self.__write_json(f)
+                    self.__sync(f)
+                os.replace(tmp_path, self.__file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            if os.path.exists(self.__log_path()):
+                os.remove(self.__log_path())
+            self.__sync_dir()
+            FileStorage.__log_records = 0
+            FileStorage.__pending = {}
+            FileStorage.__stamp = self.__stamps()
+
+    def __write_json(self, f):
+        """writes every object to f as a JSON snapshot"""
+        parts = []
+        for objs in [self.__objects] + list(self.__records.values()):
+            if type(objs) is CompactRecords:
+                # caching the JSON would cost more memory than the rows
+                parts.extend(json.dumps(key) + ": " + json.dumps(value)
+                             for key, value in objs.items())
+                continue
+            for key, obj in objs.items():
+                json_key, value = self.__serialize(key, obj)
+                parts.append(json_key + ": " + value)
+        if len(self.__serialized) > len(parts):
+            FileStorage.__serialized = self.__live(self.__serialized)
+        f.write(("{" + ", ".join(parts) + "}").encode())
+
+    def __write_binary(self, f):
+        """writes every object to f as a binary snapshot"""
+        records = []
+        for objs in [self.__objects] + list(self.__records.values()):
+            if type(objs) is CompactRecords:
+                records.extend(pack_record(value) for key, value in
+                               objs.items())
+                continue
+            for key, obj in objs.items():
+                records.append(self.__pack(key, obj))
+        if len(self.__packed) > len(records):
+            FileStorage.__packed = self.__live(self.__packed)
+        write_binary_object(f, records)
+
+    def __live(self, cache):
+        """returns the entries of cache whose objects are still stored"""
+        live = set(self.__objects).union(*self.__records.values())
+        return {key: entry for key, entry in cache.items() if key in live}
 
     def reload(self):
-        """deserializes the JSON file to __objects"""
+        """deserializes the snapshot, JSON or binary, and its log to
+        __objects if they changed on disk"""
+        stamps = self.__stamps()
+        if stamps == FileStorage.__stamp or stamps == (None, None):
+            return
+        # a snapshot that cannot be read is an error rather than an empty
+        # store, which the next save() would write over it
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except Exception:
+            with open(self.__file_path, 'rb') as f:
+                for key, value in iter_snapshot(f):
+                    self.__load(key, value)
+        except FileNotFoundError:
             pass
+        records = 0
+        try:
+            with open(self.__log_path(), 'r') as f:
+                for line in f:
+                    records += 1
+                    try:
+                        record = json.loads(line)
+                        key, value = record["key"], record["value"]
+                    except (ValueError, KeyError, TypeError):
+                        # the tail of an append torn by a crash; the
+                        # records after it are whole
+                        continue
+                    if value is None:
+                        name = key.split(".")[0]
+                        if self.__records.get(name, {}).pop(key, None):
+                            self.__link(key, name, None)
+                            self.__order.pop(name, None)
+                            self.__bump(name)
+                        self.delete(self.__objects.get(key))
+                    else:
+                        self.__load(key, value)
+        except FileNotFoundError:
+            pass
+        FileStorage.__log_records = records
+        FileStorage.__pending = {}
+        FileStorage.__stamp = stamps
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
-            key = obj.__class__.__name__ + '.' + obj.id
+            name = obj.__class__.__name__
+            key = name + '.' + obj.id
             if key in self.__objects:
+                self.__index().get(name, {}).pop(key, None)
                 del self.__objects[key]
+                order = self.__order.get(name)
+                if order is not None:
+                    i = bisect.bisect_left(order, (obj.created_at, key))
+                    if i < len(order) and order[i][1] == key:
+                        del order[i]
+                    else:
+                        del self.__order[name]
+                self.__pending[key] = None
+                self.__forget(key)
+                self.__link(key, name, None)
+                self.__bump(name)
+
+    def delete_many(self, objs):
+        """deletes every obj of objs from __objects, for a single save()"""
+        for obj in objs:
+            self.delete(obj)
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
+        """reloads the JSON file if another process wrote it since"""
         self.reload()
 
-    def get(self, cls, id):
+    def get(self, cls, id, load=()):
         """
         Returns the object based on the class name and its ID, or
-        None if not found
+        None if not found (load is accepted as in DBStorage)
         """
         if cls not in classes.values():
             return None
 
-        all_cls = self.all(cls)
-        for value in all_cls.values():
-            if (value.id == id):
-                return value
+        key = cls.__name__ + "." + str(id)
+        if key not in self.__objects:
+            self.__build(cls.__name__, [key])
+        return self.__objects.get(key)
 
-        return None
+    def related(self, cls, attr, id):
+        """
+        Returns the list of objects of class cls whose attribute attr
+        is id, from the foreign key index when attr is indexed
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        if foreign_keys.get(name) != attr:
+            return [obj for obj in self.all(name).values()
+                    if getattr(obj, attr, None) == id]
+        self.__index()
+        keys = list(self.__children.get(name, {}).get(id, ()))
+        self.__build(name, [key for key in keys if key not in self.__objects])
+        return [self.__objects[key] for key in keys]
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      limit=None, after=None):
+        """
+        Yields the places in the states or cities given, or every place
+        if both are empty, that have all the amenities given, ordered and
+        paged as by all(); the cities are walked through the foreign key
+        index and only the places returned are built
+        """
+        amenities = [id for id in amenities if self.get(Amenity, id)]
+        if not states and not cities:
+            order = self.__sorted("Place")
+        else:
+            self.__index()
+            children = self.__children
+            city_ids = dict.fromkeys(cities)
+            for state_id in states:
+                for key in children.get("City", {}).get(state_id, ()):
+                    city_ids[key.split(".", 1)[1]] = None
+            keys = [key for city_id in city_ids
+                    for key in children.get("Place", {}).get(city_id, ())]
+            order = sorted((self.__peek("Place", key, "created_at"), key)
+                           for key in keys)
+        if amenities:
+            order = [(created_at, key) for created_at, key in order
+                     if set(amenities).issubset(
+                         self.__peek("Place", key, "amenity_ids") or ())]
+        return self.__page("Place", order, limit, after)
+
+    def generation(self, cls=None):
+        """
+        Returns the number of changes made to the objects of cls, or to
+        all objects, in this process; it grows whenever they change
+        """
+        if cls is None:
+            return sum(self.__generations.values())
+        name = cls if isinstance(cls, str) else cls.__name__
+        return self.__generations.get(name, 0)
 
     def count(self, cls=None):
         """ counts number of objects of a class in storage """
+        index = self.__index()
         if cls:
-            obj_list = []
-            obj_dict = FileStorage.__objects.values()
-            for item in obj_dict:
-                if type(item).__name__ == cls:
-                    obj_list.append(item)
-            return len(obj_list)
-        else:
-            obj_list = []
-            for class_name in classes:
-                if class_name == 'BaseModel':
-                    continue
-                obj_class = FileStorage.all(self)
-                for item in obj_class:
-                    obj_list.append(item)
-            return len(obj_list)
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            return len(index.get(cls, {})) + len(self.__records.get(cls, {}))
+        return sum(len(objs) for objs_by_class in (index, self.__records)
+                   for name, objs in objs_by_class.items()
+                   if name != 'BaseModel')
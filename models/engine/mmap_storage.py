@@ -0,0 +1,564 @@
+#!/usr/bin/python3
+"""
+Contains the MmapStorage class
+"""
+
+from datetime import timedelta
+import heapq
+import marshal
+import mmap
+import os
+from os import getenv
+import struct
+import threading
+import weakref
+from models.amenity import Amenity
+from models.engine.file_storage import CompactRecords, classes
+from models.engine.file_storage import foreign_keys, marshal_version
+from models.engine.file_storage import pack_record
+
+# first bytes of a data file, followed by a format version byte and, from
+# version 2, the marshal version of its records and directory
+magic = b"HBNM"
+# format version of the data files written
+version = 2
+# (created_at, offset, length) that starts an entry; its id and the id
+# of its parent follow, each padded with NULs to the width of the segment
+entry_head = struct.Struct("<qQI")
+# entry number in the by id and by parent tables
+number = struct.Struct("<I")
+# offset of the directory, the last bytes of a data file
+trailer = struct.Struct("<Q")
+
+
+def micros(dt):
+    """returns the microseconds since the epoch of the datetime dt"""
+    return (dt - CompactRecords.epoch) // CompactRecords.microsecond
+
+
+class Segment:
+    """
+    The records of one class in a data file, read from its memory map
+
+    A segment is the records, in (created_at, id) order, then one entry
+    per record in the same order, then the entry numbers sorted by id
+    and, for the classes in foreign_keys, sorted by parent id.
+    """
+
+    def __init__(self, mm, start, length, count, id_width, parent_width,
+                 by_parent):
+        """Instantiate the segment of mm at start, whose records take
+        length bytes"""
+        self.mm = mm
+        self.start = start
+        self.count = count
+        self.id_width = id_width
+        self.parent_width = parent_width
+        self.size = entry_head.size + id_width + parent_width
+        self.entries = start + length
+        self.by_id = self.entries + count * self.size
+        self.by_parent = self.by_id + count * number.size if by_parent \
+            else None
+        self.end = self.by_id + count * number.size * (2 if by_parent else 1)
+
+    def head(self, i):
+        """returns the (created_at, offset, length) of entry i"""
+        return entry_head.unpack_from(self.mm, self.entries + i * self.size)
+
+    def id(self, i):
+        """returns the id of entry i, as bytes"""
+        pos = self.entries + i * self.size + entry_head.size
+        return self.mm[pos:pos + self.id_width].rstrip(b"\0")
+
+    def parent(self, i):
+        """returns the parent id of entry i, as bytes"""
+        pos = self.entries + i * self.size + entry_head.size + self.id_width
+        return self.mm[pos:pos + self.parent_width].rstrip(b"\0")
+
+    def record(self, i):
+        """decodes the record of entry i, and nothing else"""
+        created_at, offset, length = self.head(i)
+        offset += self.start
+        return marshal.loads(self.mm[offset:offset + length])
+
+    def __search(self, table, count, key, value):
+        """returns the first position in the table of entry numbers at
+        table whose entry has key(i) >= value"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = number.unpack_from(self.mm, table + mid * number.size)[0]
+            if key(i) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, id):
+        """returns the number of the entry of id (bytes), or None"""
+        k = self.__search(self.by_id, self.count, self.id, id)
+        if k < self.count:
+            i = number.unpack_from(self.mm, self.by_id + k * number.size)[0]
+            if self.id(i) == id:
+                return i
+        return None
+
+    def children(self, parent):
+        """returns the numbers of the entries whose parent id (bytes) is
+        parent"""
+        if self.by_parent is None:
+            return []
+        k = self.__search(self.by_parent, self.count, self.parent, parent)
+        found = []
+        while k < self.count:
+            i = number.unpack_from(self.mm,
+                                   self.by_parent + k * number.size)[0]
+            if self.parent(i) != parent:
+                break
+            found.append(i)
+            k += 1
+        return found
+
+    def after(self, created_at, id):
+        """returns the number of the first entry that comes after the
+        (created_at, id) pair, microseconds and bytes"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (self.head(mid)[0], self.id(mid)) <= (created_at, id):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class MmapStorage:
+    """
+    Keeps the objects in a memory-mapped data file, decoding each record
+    only when it is accessed
+
+    Every class has a segment of the file (see Segment) and get() finds
+    a record through the id table of its segment. Changes are kept in
+    memory until save() writes a new data file, copying the records and
+    segments that did not change as they are.
+    """
+    # string - path to the data file
+    __file_path = getenv("HBNB_MMAP_PATH", "file.mmap")
+    # mmap of the data file, None if there is none
+    __map = None
+    # integer - marshal version of the mapped data file, which the
+    # records save() copies from it are in
+    __marshal = marshal_version
+    # dictionary - <class name> -> Segment of the mapped data file
+    __segments = {}
+    # (mtime, size, inode) of __file_path as last mapped/saved
+    __stamp = None
+    # dictionary - <class name>.id -> obj (None if deleted) since last save
+    __pending = {}
+    # <class name>.id -> obj built from the data file or added, as long
+    # as it is in use, so that each record has one object
+    __objects = weakref.WeakValueDictionary()
+    # dictionary - <class name> -> number of changes made to its objects
+    __generations = {}
+    # held while the data file is written or mapped
+    __lock = threading.Lock()
+
+    def __file_stamp(self):
+        """returns the (mtime, size, inode) of __file_path, or None"""
+        try:
+            st = os.stat(self.__file_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def __open(self):
+        """maps the data file and reads its directory"""
+        segments, mm, records = {}, None, marshal_version
+        try:
+            with open(self.__file_path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # missing or empty
+            pass
+        if mm is not None:
+            if mm[:len(magic)] != magic or mm[len(magic)] > version:
+                raise ValueError("{} is not a data file of version {}"
+                                 .format(self.__file_path, version))
+            if mm[len(magic)] > 1:
+                # marshal reads the versions before its own, not those after
+                records = mm[len(magic) + 1]
+                if records > marshal.version:
+                    raise ValueError("{} holds marshal version {}"
+                                     .format(self.__file_path, records))
+            end = len(mm) - trailer.size
+            directory = marshal.loads(mm[trailer.unpack_from(mm, end)[0]:
+                                         end])
+            for name, info in directory.items():
+                segments[name] = Segment(mm, *info,
+                                         by_parent=name in foreign_keys)
+        MmapStorage.__map = mm
+        MmapStorage.__marshal = records
+        MmapStorage.__segments = segments
+        MmapStorage.__objects = weakref.WeakValueDictionary()
+
+    def __bump(self, name):
+        """counts a change to an object of class name"""
+        self.__generations[name] = self.__generations.get(name, 0) + 1
+
+    def __build(self, name, ref):
+        """returns the object of ref, a (created_at, id, obj) triple or a
+        (created_at, id, segment, entry number) quadruple, decoding its
+        record if it is not in use already"""
+        if len(ref) == 3:
+            return ref[2]
+        id = ref[1].decode()
+        key = name + "." + id
+        obj = self.__objects.get(key)
+        if obj is None:
+            value = ref[2].record(ref[3])
+            for k in ("created_at", "updated_at"):
+                if type(value.get(k)) is int:
+                    value[k] = CompactRecords.epoch + timedelta(
+                        microseconds=value[k])
+            value["id"] = id
+            obj = classes[name](**value)
+            # the record of a segment replaced since, by a save() during an
+            # iteration, may be gone from the data file now
+            if ref[2] is self.__segments.get(name):
+                self.__objects[key] = obj
+        return obj
+
+    def __attr(self, name, ref, attr):
+        """returns the attribute attr of the object of ref, without
+        building it"""
+        if len(ref) == 3:
+            return getattr(ref[2], attr, None)
+        if attr == "id":
+            return ref[1].decode()
+        return ref[2].record(ref[3]).get(attr)
+
+    def __changed(self, name):
+        """returns the ids (bytes) of the objects of class name changed
+        since the last save, and the refs of those still stored"""
+        prefix = name + "."
+        ids, refs = set(), []
+        for key, obj in self.__pending.items():
+            if key.startswith(prefix):
+                ids.add(key[len(prefix):].encode())
+                if obj is not None:
+                    refs.append((micros(obj.created_at), obj.id.encode(),
+                                 obj))
+        refs.sort(key=lambda ref: ref[:2])
+        return ids, refs
+
+    def __stream(self, name, after=None):
+        """yields the refs of class name in (created_at, id) order from
+        the cursor after on, reading its segment sequentially"""
+        ids, refs = self.__changed(name)
+        segment = self.__segments.get(name)
+        if after is not None:
+            after = (micros(after[0]), after[1].encode())
+            refs = [ref for ref in refs if ref[:2] > after]
+
+        def stored():
+            """yields the refs of the segment not changed since"""
+            if segment is None:
+                return
+            start = 0 if after is None else segment.after(*after)
+            for i in range(start, segment.count):
+                id = segment.id(i)
+                if id not in ids:
+                    yield (segment.head(i)[0], id, segment, i)
+        return heapq.merge(stored(), refs, key=lambda ref: ref[:2])
+
+    def __children(self, name, attr, parent):
+        """returns the refs of class name whose foreign key attr is parent,
+        in (created_at, id) order"""
+        ids, refs = self.__changed(name)
+        refs = [ref for ref in refs if getattr(ref[2], attr, None) == parent]
+        segment = self.__segments.get(name)
+        if segment is not None and isinstance(parent, str):
+            for i in segment.children(parent.encode()):
+                id = segment.id(i)
+                if id not in ids:
+                    refs.append((segment.head(i)[0], id, segment, i))
+        refs.sort(key=lambda ref: ref[:2])
+        return refs
+
+    def __page(self, name, refs, limit=None, after=None):
+        """yields the objects of the refs that come after the cursor after,
+        a (created_at, id) pair, at most limit of them"""
+        if after is not None:
+            after = (micros(after[0]), after[1].encode())
+        for ref in refs:
+            if limit is not None and limit <= 0:
+                return
+            if after is None or ref[:2] > after:
+                if limit is not None:
+                    limit -= 1
+                yield self.__build(name, ref)
+
+    def all(self, cls=None, load=(), limit=None, after=None):
+        """returns the dictionary of the objects of cls, or of every class
+        load is accepted as in DBStorage
+        Given limit or after, returns only the objects of cls ordered by
+        (created_at, id) that come after the (created_at, id) pair after,
+        at most limit of them"""
+        names = list(classes) if cls is None else \
+            [cls if isinstance(cls, str) else cls.__name__]
+        return {name + "." + obj.id: obj for name in names
+                for obj in self.iter(name, limit, after)}
+
+    def iter(self, cls, limit=None, after=None, where=None):
+        """
+        Yields the objects of cls whose attributes have the values in the
+        dictionary where, decoding them one at a time as they are reached,
+        in (created_at, id) order; given limit or after, they are paged as
+        by all()
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        if name not in classes:
+            return iter(())
+        where = dict(where or {})
+        attr = foreign_keys.get(name)
+        if attr in where:
+            refs = self.__children(name, attr, where.pop(attr))
+        else:
+            refs = self.__stream(name, after)
+        if where:
+            refs = (ref for ref in refs
+                    if all(self.__attr(name, ref, k) == v
+                           for k, v in where.items()))
+        return self.__page(name, refs, limit, after)
+
+    def new(self, obj):
+        """adds obj, written by the next save()"""
+        if obj is not None:
+            name = obj.__class__.__name__
+            key = name + "." + obj.id
+            self.__pending[key] = obj
+            self.__objects[key] = obj
+            self.__bump(name)
+
+    def new_many(self, objs):
+        """adds every obj of objs, for a single save()"""
+        for obj in objs:
+            self.new(obj)
+
+    def bulk_insert(self, cls, rows):
+        """
+        Adds an object of cls built from every dictionary of attributes in
+        rows; returns the number of objects added. save() writes them.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        objs = [classes[name](**row) for row in rows]
+        self.new_many(objs)
+        return len(objs)
+
+    def touch(self, obj):
+        """flags a stored obj as modified so the next save writes it"""
+        name = obj.__class__.__name__
+        key = name + "." + obj.__dict__.get("id", "")
+        if self.__objects.get(key) is obj:
+            self.__pending[key] = obj
+            self.__bump(name)
+
+    def __stored(self, name, id):
+        """returns whether the data file holds the object of class name
+        with id, ignoring the changes since"""
+        segment = self.__segments.get(name)
+        return segment is not None and \
+            segment.find(id.encode()) is not None
+
+    def delete(self, obj=None):
+        """deletes obj, from the data file at the next save()"""
+        if obj is not None:
+            name = obj.__class__.__name__
+            key = name + "." + obj.id
+            if self.__pending.get(key) is not None or \
+                    (key not in self.__pending and
+                     self.__stored(name, obj.id)):
+                self.__pending[key] = None
+                self.__objects.pop(key, None)
+                self.__bump(name)
+
+    def delete_many(self, objs):
+        """deletes every obj of objs, for a single save()"""
+        for obj in objs:
+            self.delete(obj)
+
+    def __write_segment(self, f, name, start):
+        """writes the segment of class name, with the changes since the
+        last save, to f at offset start; returns its directory entry"""
+        segment = self.__segments.get(name)
+        ids, refs = self.__changed(name)
+        if not ids and segment is not None:
+            # unchanged: offsets are relative to the segment, copy it
+            for pos in range(segment.start, segment.end, 1 << 20):
+                f.write(self.__map[pos:min(pos + (1 << 20), segment.end)])
+            return (start, segment.entries - segment.start, segment.count,
+                    segment.id_width, segment.parent_width)
+        attr = foreign_keys.get(name)
+        items = []
+        if segment is not None:
+            for i in range(segment.count):
+                id = segment.id(i)
+                if id not in ids:
+                    created_at, offset, length = segment.head(i)
+                    parent = segment.parent(i) if attr else b""
+                    items.append((created_at, id, parent, (offset, length)))
+        for created_at, id, obj in refs:
+            tag, id_, value = pack_record(obj.to_dict())
+            parent = getattr(obj, attr, None) if attr else None
+            parent = parent.encode() if isinstance(parent, str) else b""
+            items.append((created_at, id, parent,
+                          marshal.dumps(value, marshal_version)))
+        if not items:
+            return None
+        items.sort(key=lambda item: item[:2])
+        entries, length = [], 0
+        for created_at, id, parent, data in items:
+            if type(data) is tuple:
+                offset = segment.start + data[0]
+                data = self.__map[offset:offset + data[1]]
+            f.write(data)
+            entries.append((created_at, length, len(data)))
+            length += len(data)
+        id_width = max(len(item[1]) for item in items)
+        parent_width = max(len(item[2]) for item in items)
+        for (created_at, id, parent, data), head in zip(items, entries):
+            f.write(entry_head.pack(*head) + id.ljust(id_width, b"\0") +
+                    parent.ljust(parent_width, b"\0"))
+        tables = [sorted(range(len(items)), key=lambda i: items[i][1])]
+        if attr:
+            tables.append(sorted(range(len(items)),
+                                 key=lambda i: (items[i][2], items[i][1])))
+        for table in tables:
+            f.write(struct.pack("<{}I".format(len(table)), *table))
+        return (start, length, len(items), id_width, parent_width)
+
+    def save(self):
+        """writes the objects, with the changes since the last save, to a
+        new data file that replaces __file_path"""
+        with self.__lock:
+            directory = {}
+            tmp_path = "{}.{}.tmp".format(self.__file_path, os.getpid())
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(magic + bytes([version, max(
+                        marshal_version, self.__marshal)]))
+                    for name in classes:
+                        info = self.__write_segment(f, name, f.tell())
+                        if info is not None:
+                            directory[name] = info
+                    offset = f.tell()
+                    f.write(marshal.dumps(directory, marshal_version) +
+                            trailer.pack(offset))
+                os.replace(tmp_path, self.__file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            # objects in use stay valid: they hold what was written
+            objects = self.__objects
+            for key, obj in self.__pending.items():
+                if obj is not None:
+                    objects[key] = obj
+            self.__open()
+            MmapStorage.__objects = objects
+            MmapStorage.__pending = {}
+            MmapStorage.__stamp = self.__file_stamp()
+
+    def reload(self):
+        """maps the data file again if it changed on disk; the changes not
+        saved yet are kept"""
+        with self.__lock:
+            stamp = self.__file_stamp()
+            if stamp == MmapStorage.__stamp:
+                return
+            self.__open()
+            MmapStorage.__stamp = stamp
+            for name in classes:
+                self.__bump(name)
+
+    def close(self):
+        """maps the data file again if another process wrote it since"""
+        self.reload()
+
+    def get(self, cls, id, load=()):
+        """
+        Returns the object based on the class and its ID, or None if not
+        found, decoding only its record (load is accepted as in DBStorage)
+        """
+        if cls not in classes.values():
+            return None
+        name = cls.__name__
+        key = name + "." + str(id)
+        if key in self.__pending:
+            return self.__pending[key]
+        obj = self.__objects.get(key)
+        if obj is not None:
+            return obj
+        segment = self.__segments.get(name)
+        i = None if segment is None else segment.find(str(id).encode())
+        if i is None:
+            return None
+        return self.__build(name, (None, str(id).encode(), segment, i))
+
+    def related(self, cls, attr, id):
+        """
+        Returns the list of objects of class cls whose attribute attr
+        is id, from the parent id table when attr is indexed
+        """
+        return list(self.iter(cls, where={attr: id}))
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      limit=None, after=None):
+        """
+        Yields the places in the states or cities given, or every place
+        if both are empty, that have all the amenities given, ordered and
+        paged as by all(); cities and places are found through the parent
+        id tables and only the places returned are built
+        """
+        amenities = set(id for id in amenities if self.get(Amenity, id))
+        if not states and not cities:
+            refs = self.__stream("Place", after)
+        else:
+            city_ids = dict.fromkeys(cities)
+            for state_id in states:
+                for ref in self.__children("City", "state_id", state_id):
+                    city_ids[ref[1].decode()] = None
+            refs = sorted((ref for city_id in city_ids
+                           for ref in self.__children("Place", "city_id",
+                                                      city_id)),
+                          key=lambda ref: ref[:2])
+        if amenities:
+            refs = (ref for ref in refs if amenities.issubset(
+                self.__attr("Place", ref, "amenity_ids") or ()))
+        return self.__page("Place", refs, limit, after)
+
+    def generation(self, cls=None):
+        """
+        Returns the number of changes made to the objects of cls, or to
+        all objects, in this process; it grows whenever they change
+        """
+        if cls is None:
+            return sum(self.__generations.values())
+        name = cls if isinstance(cls, str) else cls.__name__
+        return self.__generations.get(name, 0)
+
+    def count(self, cls=None):
+        """counts the objects of cls, or of every class but BaseModel,
+        from the segment sizes and the changes since the last save"""
+        if cls is None:
+            return sum(self.count(name) for name in classes
+                       if name != "BaseModel")
+        name = cls if isinstance(cls, str) else cls.__name__
+        segment = self.__segments.get(name)
+        count = 0 if segment is None else segment.count
+        prefix = name + "."
+        for key, obj in self.__pending.items():
+            if key.startswith(prefix):
+                count += (obj is not None) - \
+                    self.__stored(name, key[len(prefix):])
+        return count
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Converts a FileStorage snapshot between the JSON and binary formats
+
+usage: ./snapshot.py json|binary [--file file.json] [--output path]
+
+The snapshot is read in either format and written in the one given,
+one object at a time, to --output or over --file. FileStorage reads
+both formats; HBNB_FILE_FORMAT=binary makes it write binary ones.
+"""
+
+import argparse
+import json
+import os
+from models.base_model import format_time
+from models.engine.file_storage import iter_snapshot, pack_record
+from models.engine.file_storage import write_binary_object
+
+
+def convert(path, output, fmt):
+    """writes the snapshot at path to output in the format fmt, "json"
+    or "binary"; returns the number of objects written"""
+    count = 0
+
+    def values(f):
+        """yields the values of the snapshot in f, counting them"""
+        nonlocal count
+        for key, value in iter_snapshot(f):
+            count += 1
+            yield value
+    tmp_path = "{}.{}.tmp".format(output, os.getpid())
+    try:
+        with open(path, "rb") as f, open(tmp_path, "wb") as out:
+            if fmt == "binary":
+                write_binary_object(out, map(pack_record, values(f)))
+            else:
+                out.write(b"{")
+                for value in values(f):
+                    key = value["__class__"] + "." + value["id"]
+                    # times of a binary snapshot come as datetimes
+                    value = json.dumps(value, default=format_time)
+                    out.write(((", " if count > 1 else "") +
+                               json.dumps(key) + ": " + value).encode())
+                out.write(b"}")
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def main(argv=None):
+    """parses the command line and converts the snapshot"""
+    parser = argparse.ArgumentParser(
+        description="Convert a snapshot between the JSON and binary formats")
+    parser.add_argument("format", choices=["json", "binary"])
+    parser.add_argument("--file", default="file.json")
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+    count = convert(args.file, args.output or args.file, args.format)
+    print("wrote {} objects to {} as {}".format(
+        count, args.output or args.file, args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+"""
+Contains the TestResponseCache class
+"""
+
+from api.v1 import app as app_module
+from api.v1.app import ResponseCache, app
+import models
+import os
+import pep8
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+
+class TestAppDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the app module"""
+    def test_pep8_conformance_app(self):
+        """Test that app.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/app.py',
+                                    'tests/test_api/test_app.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_response_cache_docstrings(self):
+        """Test for the docstrings of ResponseCache"""
+        for func in (ResponseCache, ResponseCache.get, ResponseCache.put,
+                     ResponseCache.stats):
+            self.assertTrue(len(func.__doc__) >= 1)
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the cache of GET responses"""
+    def setUp(self):
+        """Gives the app an empty cache and a test client"""
+        self.cache = ResponseCache(1 << 20, 60)
+        patcher = mock.patch.object(app_module, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def get(self, url):
+        """returns the status and the JSON of the response to GET url"""
+        response = self.client.get(url)
+        try:
+            return response.status_code, response.get_json()
+        finally:
+            response.close()
+
+    def create(self, url, data):
+        """creates an object through the API, deleted when the test ends"""
+        response = self.client.post(url, json=data)
+        self.assertEqual(response.status_code, 201)
+        obj = response.get_json()
+        path = {"State": "states", "City": "cities"}[obj["__class__"]]
+        self.addCleanup(self.client.delete,
+                        "/api/v1/{}/{}".format(path, obj["id"]))
+        return obj
+
+    def test_hit(self):
+        """Test that a second GET is served from the cache"""
+        state = self.create("/api/v1/states", {"name": "California"})
+        url = "/api/v1/states/" + state["id"]
+        self.assertEqual(self.get(url), (200, state))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+        with mock.patch.object(models.storage, "get") as get:
+            self.assertEqual(self.get(url), (200, state))
+            self.assertFalse(get.called)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.get(url + "?fields=name")
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_invalidate_class(self):
+        """Test that a PUT or a DELETE of an object invalidates the
+        responses built from its class"""
+        state = self.create("/api/v1/states", {"name": "California"})
+        url = "/api/v1/states/" + state["id"]
+        self.get(url)
+        self.get("/api/v1/states")
+        self.client.put(url, json={"name": "Nevada"})
+        self.assertEqual(self.get(url)[1]["name"], "Nevada")
+        names = [s["name"] for s in self.get("/api/v1/states")[1]
+                 if s["id"] == state["id"]]
+        self.assertEqual(names, ["Nevada"])
+        self.assertEqual(self.cache.stats()["hits"], 0)
+        self.client.delete(url)
+        self.assertEqual(self.get(url)[0], 404)
+        ids = [s["id"] for s in self.get("/api/v1/states")[1]]
+        self.assertNotIn(state["id"], ids)
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    def test_invalidate_parent(self):
+        """Test that a change to the parent or the children of a listing
+        invalidates it"""
+        state = self.create("/api/v1/states", {"name": "California"})
+        url = "/api/v1/states/{}/cities".format(state["id"])
+        city = self.create(url, {"name": "Fremont"})
+        self.assertEqual(self.get(url), (200, [city]))
+        self.client.put("/api/v1/states/" + state["id"],
+                        json={"name": "Nevada"})
+        self.assertEqual(self.get(url), (200, [city]))
+        self.assertEqual(self.cache.stats()["hits"], 0)
+        self.client.delete("/api/v1/cities/" + city["id"])
+        self.assertEqual(self.get(url), (200, []))
+        self.client.delete("/api/v1/states/" + state["id"])
+        self.assertEqual(self.get(url)[0], 404)
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_invalidate_other_process(self):
+        """Test that a commit by another process invalidates the responses
+        built from its class"""
+        url = models.storage._DBStorage__engine.url
+        if url.database in (None, "", ":memory:"):
+            self.skipTest("an in-memory database is not shared")
+        status, states = self.get("/api/v1/states")
+        self.get("/api/v1/states")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        # the row counts of this process are kept by its own commits
+        script = ("from models import storage\n"
+                  "from models.state import State\n"
+                  "for state in storage.all(State).values():\n"
+                  "    if state.name == 'Other':\n"
+                  "        storage.delete(state)\n"
+                  "if {}:\n"
+                  "    storage.new(State(name='Other'))\n"
+                  "storage.save()\n")
+        env = dict(os.environ, HBNB_ENV="dev")
+        subprocess.run([sys.executable, "-c", script.format(True)],
+                       env=env, check=True)
+        self.addCleanup(subprocess.run, [sys.executable, "-c",
+                                         script.format(False)],
+                        env=env, check=True)
+        found = self.get("/api/v1/states")[1]
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(len(found), len(states) + 1)
+
+    def test_generation_unlocked(self):
+        """Test that the generations are read without holding the lock"""
+        cache = ResponseCache(100, 60)
+        cache.put("a", {"State": 1}, 200, [], b"body")
+        lock = cache._ResponseCache__lock
+
+        def generation(name):
+            """returns the generation 1, checking the lock is free"""
+            self.assertFalse(lock.locked())
+            return 1
+        with mock.patch.object(models.storage, "generation",
+                               side_effect=generation) as mocked:
+            self.assertEqual(cache.get("a"), (200, [], b"body"))
+            mocked.side_effect = lambda name: 2
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_ttl(self):
+        """Test that an entry is dropped once older than the ttl"""
+        cache = ResponseCache(100, 10)
+        with mock.patch.object(app_module.time, "monotonic") as monotonic:
+            monotonic.return_value = 100
+            cache.put("a", {}, 200, [], b"body")
+            monotonic.return_value = 110
+            self.assertEqual(cache.get("a"), (200, [], b"body"))
+            monotonic.return_value = 110.5
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_size(self):
+        """Test that the least recently used entries are evicted to stay
+        within the size, and that bigger bodies are not stored"""
+        cache = ResponseCache(10, 60)
+        cache.put("a", {}, 200, [], b"aaaa")
+        cache.put("b", {}, 200, [], b"bbbb")
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", {}, 200, [], b"cccc")
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.put("d", {}, 200, [], b"d" * 11)
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.stats(), {
+            "entries": 2, "bytes": 8, "size": 10, "ttl": 60, "hits": 3,
+            "misses": 2, "evictions": 1})
+
+    def test_stats(self):
+        """Test that /stats/cache reports the counters of the cache"""
+        self.get("/api/v1/states")
+        self.get("/api/v1/states")
+        status, stats = self.get("/api/v1/stats/cache")
+        self.assertEqual(status, 200)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["hits"], 1)
+        # the request for the stats is looked up too
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["evictions"], 0)
+        self.assertEqual(stats["size"], 1 << 20)
+        self.assertEqual(stats["bytes"], self.cache.used)
+        self.assertGreater(stats["bytes"], 0)
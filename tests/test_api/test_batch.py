@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+"""
+Contains the TestBatch class
+"""
+
+from api.v1.app import app
+from api.v1 import views
+from api.v1.views import batch
+import models
+import pep8
+import unittest
+from unittest import mock
+
+
+class TestBatchDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the batch module"""
+    def test_pep8_conformance_batch(self):
+        """Test that batch.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/batch.py',
+                                    'tests/test_api/test_batch.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_batch_docstrings(self):
+        """Test for the docstrings of the batch module"""
+        self.assertTrue(len(batch.__doc__) >= 1)
+        for func in (batch.batch_items, batch.create_many, batch.update_many,
+                     batch.delete_many, batch.batch_objects):
+            self.assertTrue(len(func.__doc__) >= 1)
+
+    def test_exports(self):
+        """Test that the views package only gets the view function"""
+        self.assertEqual(batch.__all__, ["batch_objects"])
+        self.assertFalse(hasattr(views, "delete_many"))
+        self.assertFalse(hasattr(views, "resources"))
+
+
+class TestBatch(unittest.TestCase):
+    """Test the batch create, update and delete endpoints"""
+    def setUp(self):
+        """Creates a test client of the API and counts the saves of the
+        storage"""
+        self.client = app.test_client()
+        patcher = mock.patch.object(models.storage, "save",
+                                    wraps=models.storage.save)
+        self.save = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method, name, items):
+        """sends items to the batch endpoint of name, checking that the
+        storage is saved once, and returns the results"""
+        self.save.reset_mock()
+        response = self.client.open("/api/v1/{}/batch".format(name),
+                                    method=method, json=items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.save.call_count, 1)
+        return response.get_json()
+
+    def create_states(self, *names):
+        """creates a State of every name, deleted when the test ends"""
+        results = self.request("POST", "states",
+                               [{"name": name} for name in names])
+        states = [result["object"] for result in results]
+        self.addCleanup(self.client.delete, "/api/v1/states/batch",
+                        json=[state["id"] for state in states])
+        return states
+
+    def test_create(self):
+        """Test that valid items are created and invalid ones reported"""
+        state, = self.create_states("California")
+        results = self.request("POST", "cities", [
+            {"state_id": state["id"], "name": "Fremont"},
+            {"state_id": state["id"]},
+            {"state_id": "missing", "name": "Nowhere"},
+            "Fremont",
+            {"state_id": state["id"], "name": "Oakland"}])
+        self.addCleanup(self.client.delete, "/api/v1/cities/batch", json=[
+            result["object"]["id"] for result in results
+            if "object" in result])
+        self.assertEqual([result["status"] for result in results],
+                         [201, 400, 404, 400, 201])
+        self.assertEqual(results[1]["error"], "Missing name")
+        self.assertEqual(results[3]["error"], "Not a JSON")
+        response = self.client.get("/api/v1/states/{}/cities".format(
+            state["id"]))
+        self.assertEqual(sorted(city["name"] for city in response.get_json()),
+                         ["Fremont", "Oakland"])
+
+    def test_update(self):
+        """Test that the objects named are updated and the others
+        reported"""
+        ca, nv = self.create_states("California", "Nevada")
+        results = self.request("PATCH", "states", [
+            {"id": ca["id"], "name": "CA", "created_at": "2000-01-01"},
+            {"id": "missing", "name": "Nowhere"},
+            {"name": "No id"},
+            [],
+            {"id": nv["id"], "name": "NV"}])
+        self.assertEqual([result["status"] for result in results],
+                         [200, 404, 404, 400, 200])
+        self.assertEqual(results[0]["object"]["created_at"], ca["created_at"])
+        for id, name in [(ca["id"], "CA"), (nv["id"], "NV")]:
+            response = self.client.get("/api/v1/states/" + id)
+            self.assertEqual(response.get_json()["name"], name)
+
+    def test_delete(self):
+        """Test that the objects named are deleted and the others
+        reported"""
+        ca, nv = self.create_states("California", "Nevada")
+        results = self.request("DELETE", "states",
+                               [ca["id"], "missing", 7, nv["id"]])
+        self.assertEqual(results, [
+            {"status": 200, "id": ca["id"]},
+            {"status": 404, "error": "Not found"},
+            {"status": 404, "error": "Not found"},
+            {"status": 200, "id": nv["id"]}])
+        for id in (ca["id"], nv["id"]):
+            response = self.client.get("/api/v1/states/" + id)
+            self.assertEqual(response.status_code, 404)
+
+    def test_not_a_list(self):
+        """Test that a body that is not a JSON list is a 400"""
+        for body in ({"name": "California"}, "California", None):
+            with self.subTest(body=body):
+                response = self.client.post("/api/v1/states/batch",
+                                            json=body)
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.save.called)
+
+    def test_batch_limit(self):
+        """Test that a batch of more items than the limit is rejected
+        without changing anything"""
+        with mock.patch.object(batch, "batch_limit", 2):
+            response = self.client.post("/api/v1/states/batch", json=[
+                {"name": str(i)} for i in range(3)])
+            self.assertEqual(response.status_code, 413)
+            self.assertFalse(self.save.called)
+            states = self.create_states("0", "1")
+            self.assertEqual(len(states), 2)
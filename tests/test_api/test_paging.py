@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""
+Contains the TestPaging class
+"""
+
+from api.v1.app import app
+from api.v1.views import paging
+import models
+import pep8
+import unittest
+
+
+class TestPagingDocs(unittest.TestCase):
+    """Tests to check the style of the paging module"""
+    def test_pep8_conformance_paging(self):
+        """Test that paging.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/paging.py',
+                                    'tests/test_api/test_paging.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+
+class TestPaging(unittest.TestCase):
+    """Test the arguments of the list endpoints"""
+    def setUp(self):
+        """Creates a test client of the API"""
+        self.client = app.test_client()
+
+    def test_invalid_limit(self):
+        """Test that a limit that is not a positive integer is a 400"""
+        for limit in ("0", "-1", "x", "1.5", "%C2%B2"):
+            with self.subTest(limit=limit):
+                response = self.client.get(
+                    "/api/v1/states?limit=" + limit)
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        """Test that a cursor that does not decode is a 400"""
+        response = self.client.get("/api/v1/states?cursor=x")
+        self.assertEqual(response.status_code, 400)
+
+    def test_limit(self):
+        """Test that a valid limit is accepted"""
+        response = self.client.get("/api/v1/states?limit=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.get_json()), 1)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_stream_releases_connection(self):
+        """Test that a streamed list gives its connection back to the pool
+        once it is sent, for more requests than the pool holds"""
+        stats = models.storage.pool_stats()
+        if "size" not in stats:
+            self.skipTest("the pool does not count connections")
+        for i in range(stats["size"] + 2):
+            response = self.client.get("/api/v1/states")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_streamed)
+            response.get_data()
+            response.close()
+            self.assertEqual(models.storage.pool_stats()["checked_out"], 0)
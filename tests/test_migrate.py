@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""
+Contains the tests of migrate.py
+"""
+
+import contextlib
+import io
+import json
+import migrate
+import models
+from models.amenity import Amenity
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.state import State
+from models.user import User
+import os
+import pep8
+import shutil
+import tempfile
+import unittest
+
+
+class TestMigrateDocs(unittest.TestCase):
+    """Tests to check the documentation and style of migrate.py"""
+    def test_pep8_conformance_migrate(self):
+        """Test that migrate.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['migrate.py', 'tests/test_migrate.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_migrate_docstrings(self):
+        """Test for the docstrings of migrate.py"""
+        self.assertTrue(len(migrate.__doc__) >= 1)
+        for func in (migrate.Progress, migrate.copy_class, migrate.migrate,
+                     migrate.main):
+            self.assertTrue(len(func.__doc__) >= 1)
+
+
+class TestMigrate(unittest.TestCase):
+    """Test copying objects between the database and a file"""
+    def setUp(self):
+        """Points FileStorage at a temporary directory"""
+        tmp = tempfile.mkdtemp()
+        self.path = os.path.join(tmp, "file.json")
+        for attr in ("file_path", "objects", "stamp", "pending"):
+            name = "_FileStorage__" + attr
+            self.addCleanup(setattr, FileStorage, name,
+                            getattr(FileStorage, name))
+        self.addCleanup(shutil.rmtree, tmp)
+
+    def run_main(self, *argv):
+        """runs migrate.py with the arguments argv, quietly"""
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            migrate.main(list(argv) + ["--file", self.path])
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_round_trip(self):
+        """Test that objects copied to a file and back are the same"""
+        storage = models.storage
+        state = State(name="California")
+        city = City(state_id=state.id, name="San Francisco")
+        user = User(email="migrate@hbnb.io", password="pwd")
+        amenity = Amenity(name="Wifi")
+        place = Place(city_id=city.id, user_id=user.id, name="Loft")
+        place.amenities.append(amenity)
+        objs = [state, city, user, amenity, place]
+        storage.new_many(objs)
+        storage.save()
+        self.run_main("db-to-file", "--chunk", "1")
+        with open(self.path) as f:
+            stored = json.load(f)
+        self.assertEqual(stored["Place." + place.id]["amenity_ids"],
+                         [amenity.id])
+        self.assertNotIn("password", stored["User." + user.id])
+        storage.delete_many([place, city, state, user, amenity])
+        storage.save()
+        self.run_main("file-to-db")
+        storage.close()
+        copy = storage.get(Place, place.id)
+        self.assertEqual(copy.name, "Loft")
+        self.assertEqual([a.id for a in copy.amenities], [amenity.id])
+        self.assertEqual(copy.created_at, place.created_at)
+        self.assertEqual(storage.get(User, user.id).password, "")
+        storage.delete_many([storage.get(cls, obj.id) for cls, obj in
+                             [(Place, place), (City, city), (State, state),
+                              (User, user), (Amenity, amenity)]])
+        storage.save()
@@ -158,3 +158,31 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(old_created_at, new_created_at)
         self.assertTrue(mock_storage.new.called)
         self.assertTrue(mock_storage.save.called)
+
+    def test_parse_time(self):
+        """Test that parse_time agrees with strptime on the time format"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        for string in ["2017-09-28T21:05:54.119427",
+                       "2017-09-28T21:05:54.000000",
+                       "2017-09-28T21:05:54.1"]:
+            with self.subTest(string=string):
+                self.assertEqual(models.base_model.parse_time(string),
+                                 datetime.strptime(string, t_format))
+        for string in ["2017-09-28", "2017-09-28 21:05:54.119427",
+                       "2017-09-28T21:05:54+00:00",
+                       "2017-09-28T21:03:54.123+01",
+                       "2017-09-28T21:03:54.12345Z",
+                       "2017-W39-4T21:03:54.123456",
+                       "2017-09-28T21:03:54.12345\u0661"]:
+            with self.subTest(string=string):
+                with self.assertRaises(ValueError):
+                    models.base_model.parse_time(string)
+
+    def test_format_time(self):
+        """Test that format_time agrees with strftime on the time format"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        for dt in [datetime(2017, 9, 28, 21, 5, 54, 119427),
+                   datetime(2017, 9, 28), datetime(17, 9, 28, 1, 2, 3, 4)]:
+            with self.subTest(dt=dt):
+                self.assertEqual(models.base_model.format_time(dt),
+                                 dt.strftime(t_format))
@@ -3,7 +3,7 @@
 Contains the TestDBStorageDocs and TestDBStorage classes
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import inspect
 import models
 from models.engine import db_storage
@@ -17,7 +17,13 @@ from models.user import User
 import json
 import os
 import pep8
+import shutil
+import sqlalchemy
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
 DBStorage = db_storage.DBStorage
 classes = {"Amenity": Amenity, "City": City, "Place": Place,
            "Review": Review, "State": State, "User": User}
@@ -86,3 +92,335 @@ class TestFileStorage(unittest.TestCase):
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_save(self):
         """Test that save properly saves objects to file.json"""
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_get(self):
+        """Test that get returns the row with the matching class and id"""
+        state = State(name="California")
+        state.save()
+        self.assertIs(models.storage.get(State, state.id), state)
+        self.assertIsNone(models.storage.get(City, state.id))
+        self.assertIsNone(models.storage.get(State, "missing"))
+        models.storage.delete(state)
+        models.storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_count(self):
+        """Test that count agrees with the number of rows"""
+        total = models.storage.count()
+        states = models.storage.count(State)
+        state = State(name="California")
+        state.save()
+        self.assertEqual(models.storage.count(State), states + 1)
+        self.assertEqual(models.storage.count("State"), states + 1)
+        self.assertEqual(models.storage.count(), total + 1)
+        self.assertEqual(models.storage.count(),
+                         sum(len(models.storage.all(cls))
+                             for cls in classes.values()))
+        models.storage.delete(state)
+        models.storage.save()
+        self.assertEqual(models.storage.count(State), states)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_new_many_delete_many(self):
+        """Test that new_many and delete_many commit with one save"""
+        states = models.storage.count(State)
+        objs = [State(name=str(i)) for i in range(3)]
+        models.storage.new_many(objs)
+        models.storage.save()
+        self.assertEqual(models.storage.count(State), states + 3)
+        models.storage.close()
+        self.assertEqual(models.storage.get(State, objs[0].id).name, "0")
+        models.storage.delete_many(
+            [models.storage.get(State, obj.id) for obj in objs])
+        models.storage.save()
+        self.assertEqual(models.storage.count(State), states)
+        self.assertIsNone(models.storage.get(State, objs[1].id))
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_bulk_insert(self):
+        """Test that bulk_insert writes rows and place_amenity links"""
+        storage = models.storage
+        state = State(name="California")
+        city = City(state_id=state.id, name="San Francisco")
+        user = User(email="bulk@hbnb.io", password="pwd")
+        amenity = Amenity(name="Wifi")
+        storage.new_many([state, city, user, amenity])
+        storage.save()
+        places = storage.count(Place)
+        generation = storage.generation(Place)
+        with mock.patch.object(type(storage), "batch_size", 2):
+            self.assertEqual(storage.bulk_insert(Place, [
+                {"city_id": city.id, "user_id": user.id, "name": str(i),
+                 "amenity_ids": [amenity.id]} for i in range(3)]), 3)
+        storage.save()
+        self.assertEqual(storage.count(Place), places + 3)
+        self.assertGreater(storage.generation(Place), generation)
+        storage.close()
+        found = list(storage.search_places(cities=[city.id],
+                                           amenities=[amenity.id]))
+        self.assertEqual(sorted(place.name for place in found),
+                         ["0", "1", "2"])
+        self.assertEqual(found[0].number_rooms, 0)
+        self.assertIsNotNone(found[0].created_at)
+        storage.delete_many(found + [city, state, user, amenity])
+        storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_count_without_queries(self):
+        """Test that count reads the counters kept on commit"""
+        states = models.storage.count(State)
+        state = State(name="California")
+        models.storage.new(state)
+        models.storage.save()
+        statements = []
+        engine = models.storage._DBStorage__engine
+        listener = (lambda conn, cursor, statement, *args:
+                    statements.append(statement))
+        sqlalchemy.event.listen(engine, "before_cursor_execute", listener)
+        try:
+            self.assertEqual(models.storage.count(State), states + 1)
+            models.storage.count()
+        finally:
+            sqlalchemy.event.remove(engine, "before_cursor_execute",
+                                    listener)
+        self.assertEqual(statements, [])
+        models.storage.delete(state)
+        models.storage.save()
+        models.storage._DBStorage__recount()
+        self.assertEqual(models.storage.count(State), states)
+
+
+class TestDBStoragePool(unittest.TestCase):
+    """Test the connection pool options and statistics of DBStorage"""
+    def make_storage(self, env):
+        """Returns a DBStorage on a SQLite file configured by env"""
+        path = os.path.join(tempfile.mkdtemp(), "hbnb.db")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        env = dict(env, HBNB_DB_URL="sqlite:///" + path)
+        with mock.patch.dict(os.environ, env):
+            return DBStorage()
+
+    def test_engine_options(self):
+        """Test that HBNB_MYSQL_POOL_* variables become engine options"""
+        env = {"HBNB_MYSQL_POOL_SIZE": "2", "HBNB_MYSQL_MAX_OVERFLOW": "1",
+               "HBNB_MYSQL_POOL_TIMEOUT": "0.5",
+               "HBNB_MYSQL_POOL_RECYCLE": "300",
+               "HBNB_MYSQL_POOL_PRE_PING": "1"}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(db_storage.engine_options("mysql+mysqldb://"),
+                             {"poolclass": db_storage.TimedQueuePool,
+                              "pool_size": 2, "max_overflow": 1,
+                              "pool_timeout": 0.5, "pool_recycle": 300,
+                              "pool_pre_ping": True})
+            options = db_storage.engine_options("sqlite://")
+        self.assertIs(options["poolclass"], sqlalchemy.pool.StaticPool)
+        self.assertNotIn("pool_size", options)
+
+    def test_sqlite_pragmas(self):
+        """Test that SQLite connections use WAL and enforce foreign keys"""
+        storage = self.make_storage({})
+        with storage._DBStorage__engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA foreign_keys").scalar(), 1)
+
+    def test_pool_stats(self):
+        """Test that pool_stats reports checkouts, overflow and timeouts"""
+        storage = self.make_storage({"HBNB_MYSQL_POOL_SIZE": "1",
+                                     "HBNB_MYSQL_MAX_OVERFLOW": "1",
+                                     "HBNB_MYSQL_POOL_TIMEOUT": "0.1"})
+        engine = storage._DBStorage__engine
+        checkouts = storage.pool_stats()["checkouts"]
+        connections = [engine.connect(), engine.connect()]
+        stats = storage.pool_stats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["checked_out"], 2)
+        self.assertEqual(stats["overflow"], 1)
+        self.assertRaises(sqlalchemy.exc.TimeoutError, engine.connect)
+        for connection in connections:
+            connection.close()
+        stats = storage.pool_stats()
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["checkouts"], checkouts + 3)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["max_wait"], 0.1)
+        self.assertGreaterEqual(stats["wait_time"], stats["max_wait"])
+
+
+class TestDBStorageLoad(unittest.TestCase):
+    """Test eager loading of relationships in DBStorage"""
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_load(self):
+        """Test that load fetches relationships in one query each"""
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            models.storage.new(state)
+            for i in range(2):
+                models.storage.new(City(name=str(i), state_id=state.id))
+        models.storage.save()
+        models.storage.close()
+        statements = []
+        engine = models.storage._DBStorage__engine
+        listener = (lambda conn, cursor, statement, *args:
+                    statements.append(statement))
+        sqlalchemy.event.listen(engine, "before_cursor_execute", listener)
+        try:
+            loaded = models.storage.all(State, load=("cities.places",))
+            for state in states:
+                self.assertEqual(
+                    len(loaded["State." + state.id].cities), 2)
+            self.assertEqual(len(statements), 3)
+            for state in loaded.values():
+                self.assertNotIn("cities", state.to_dict())
+        finally:
+            sqlalchemy.event.remove(engine, "before_cursor_execute",
+                                    listener)
+        for state in states:
+            state = loaded["State." + state.id]
+            for city in state.cities:
+                models.storage.delete(city)
+            models.storage.delete(state)
+        models.storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_get_load_in_session(self):
+        """Test that get loads relationships of an object already in the
+        session"""
+        state = State(name="California")
+        models.storage.new(state)
+        models.storage.new(City(name="Fremont", state_id=state.id))
+        models.storage.save()
+        models.storage.close()
+        state = models.storage.get(State, state.id)
+        self.assertNotIn("cities", state.__dict__)
+        loaded = models.storage.get(State, state.id, load=("cities",))
+        self.assertIs(loaded, state)
+        self.assertIn("cities", state.__dict__)
+        self.assertEqual(len(state.cities), 1)
+        models.storage.delete(state.cities[0])
+        models.storage.delete(state)
+        models.storage.save()
+
+
+class TestDBStoragePage(unittest.TestCase):
+    """Test keyset paging in DBStorage"""
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_all_page(self):
+        """Test that all pages through a class in (created_at, id) order"""
+        now = datetime(2017, 9, 28, 21, 3, 54, 52298)
+        states = [State(name=str(i), created_at=now + timedelta(i // 2))
+                  for i in range(5)]
+        for state in states:
+            models.storage.new(state)
+        models.storage.save()
+        states.sort(key=lambda state: (state.created_at, state.id))
+
+        def page(limit=None, after=None):
+            return [state for state in models.storage.all(
+                State, limit=limit, after=after).values()
+                if state in states]
+        try:
+            self.assertEqual(page(2), states[:2])
+            cursor = (states[1].created_at, states[1].id)
+            self.assertEqual(page(2, cursor), states[2:4])
+            self.assertEqual(page(after=cursor), states[2:])
+            places = models.storage.search_places(limit=1)
+            self.assertEqual(list(places), [])
+            found = models.storage.iter(State, after=cursor,
+                                        where={"name": "3"})
+            self.assertEqual([state.name for state in found], ["3"])
+            found = models.storage.iter("State", limit=3)
+            self.assertEqual(list(found), states[:3])
+        finally:
+            for state in states:
+                models.storage.delete(state)
+            models.storage.save()
+
+
+class TestDBStorageGeneration(unittest.TestCase):
+    """Test the per-class generations of DBStorage"""
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_generation(self):
+        """Test that generation grows with every commit changing a class"""
+        storage = models.storage
+        states, cities = storage.generation(State), storage.generation(City)
+        total = storage.generation()
+        state = State(name="CA")
+        storage.new(state)
+        self.assertEqual(storage.generation(State), states)
+        storage.save()
+        self.assertEqual(storage.generation(State), states + 1)
+        state.name = "NV"
+        storage.save()
+        self.assertEqual(storage.generation("State"), states + 2)
+        storage.new(City(name="SF"))
+        with self.assertRaises(sqlalchemy.exc.IntegrityError):
+            storage.save()
+        storage._DBStorage__session.rollback()
+        storage.save()
+        self.assertEqual(storage.generation(City), cities)
+        storage.delete(state)
+        storage.save()
+        self.assertEqual(storage.generation(State), states + 3)
+        self.assertEqual(storage.generation(), total + 3)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_generation_shared(self):
+        """Test that generation grows with the commits of another process"""
+        url = models.storage._DBStorage__engine.url
+        if url.database in (None, "", ":memory:"):
+            self.skipTest("an in-memory database is not shared")
+        script = ("from models import storage\n"
+                  "from models.state import State\n"
+                  "state = State(name='CA')\n"
+                  "storage.new(state)\n"
+                  "storage.save()\n"
+                  "storage.delete(state)\n"
+                  "storage.save()\n")
+        models.storage.close()
+        states = models.storage.generation(State)
+        models.storage.close()
+        env = dict(os.environ, HBNB_ENV="dev")
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+        self.assertEqual(models.storage.generation(State), states + 2)
+
+
+class TestDBStorageSearch(unittest.TestCase):
+    """Test searching places in DBStorage"""
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_search_places(self):
+        """Test search_places filters by state, city and amenities"""
+        user = User(email="a@b.c", password="pwd")
+        ca, nv = State(name="CA"), State(name="NV")
+        sf = City(name="SF", state_id=ca.id)
+        la = City(name="LA", state_id=ca.id)
+        reno = City(name="Reno", state_id=nv.id)
+        home, flat, cabin = [Place(name=str(i), city_id=city.id,
+                                   user_id=user.id)
+                             for i, city in enumerate([sf, la, reno])]
+        wifi, pool = Amenity(name="Wifi"), Amenity(name="Pool")
+        home.amenities.extend([wifi, pool])
+        flat.amenities.append(wifi)
+        objs = [user, ca, nv, sf, la, reno, home, flat, cabin, wifi, pool]
+        for obj in objs:
+            models.storage.new(obj)
+        models.storage.save()
+        search = models.storage.search_places
+        try:
+            self.assertTrue({home, flat, cabin} <= set(search()))
+            self.assertCountEqual(search([ca.id]), [home, flat])
+            self.assertCountEqual(search([ca.id], [sf.id, reno.id]),
+                                  [home, flat, cabin])
+            self.assertCountEqual(search([], [la.id]), [flat])
+            self.assertCountEqual(search([ca.id], [], [wifi.id]),
+                                  [home, flat])
+            self.assertCountEqual(search([ca.id], [], [wifi.id, pool.id]),
+                                  [home])
+            self.assertCountEqual(search([nv.id], [], ["missing"]),
+                                  [cabin])
+        finally:
+            for obj in reversed(objs):
+                models.storage.delete(obj)
+            models.storage.save()
@@ -3,8 +3,9 @@
 Contains the TestFileStorageDocs classes
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import inspect
+import io
 import models
 from models.engine import file_storage
 from models.amenity import Amenity
@@ -17,7 +18,11 @@ from models.user import User
 import json
 import os
 import pep8
+import shutil
+import tempfile
+import threading
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -68,8 +73,100 @@ test_file_storage.py'])
                             "{:s} method needs a docstring".format(func[0]))
 
 
+class TestIterJsonObject(unittest.TestCase):
+    """Test the streaming reader used by FileStorage.reload"""
+    def test_pairs(self):
+        """Test that pairs are read back whatever the chunk size"""
+        jo = {"State.1": {"name": "a \\\"}, b", "n": 12345},
+              "City.2": {"ids": [1, 2.5, None, True]}, "x": "y"}
+        for text in [json.dumps(jo), json.dumps(jo, indent=4)]:
+            for chunk_size in [1, 3, 64]:
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    pairs = file_storage.iter_json_object(io.StringIO(text),
+                                                          chunk_size)
+                    self.assertEqual(list(pairs), list(jo.items()))
+
+    def test_empty(self):
+        """Test that an empty object yields nothing"""
+        self.assertEqual(list(file_storage.iter_json_object(
+            io.StringIO(" { } "))), [])
+
+    def test_invalid(self):
+        """Test that truncated or malformed JSON raises ValueError"""
+        for text in ['', '[1]', '{"a": 1', '{"a" 1}', '{"a": 1,}']:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    list(file_storage.iter_json_object(io.StringIO(text), 2))
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    """Test the binary snapshot reader and writer"""
+    def test_round_trip(self):
+        """Test that the binary snapshot holds the JSON snapshot values,
+        times as datetimes"""
+        jo = {"State.1": {"id": "1", "__class__": "State", "name": "a",
+                          "created_at": "2017-09-28T21:05:54.119427",
+                          "updated_at": "not a time"},
+              "Place.2": {"id": "2", "__class__": "Place", "max_guest": 4,
+                          "latitude": 2.5, "amenity_ids": ["x", "y"],
+                          "description": None}}
+        f = io.BytesIO()
+        file_storage.write_binary_object(
+            f, (file_storage.pack_record(v) for v in jo.values()), 1)
+        f.seek(0)
+        self.assertEqual(f.read(6), file_storage.magic + b"\x02\x04")
+        f.seek(0)
+        pairs = list(file_storage.iter_snapshot(f))
+        self.assertEqual(pairs[0][1].pop("created_at"),
+                         datetime(2017, 9, 28, 21, 5, 54, 119427))
+        del jo["State.1"]["created_at"]
+        self.assertEqual(pairs, list(jo.items()))
+        f = io.BytesIO(json.dumps(jo).encode())
+        self.assertEqual(list(file_storage.iter_snapshot(f)),
+                         list(jo.items()))
+
+    def test_marshal_version(self):
+        """Test that the blocks are written with the pinned marshal version
+        and that version 1 snapshots, which do not record it, still read"""
+        record = (0, "1", {"name": "a"})
+        with mock.patch.object(file_storage.marshal, "dumps",
+                               wraps=file_storage.marshal.dumps) as dumps:
+            file_storage.write_binary_object(io.BytesIO(), [record])
+        for call in dumps.call_args_list:
+            self.assertEqual(call.args[1], file_storage.marshal_version)
+        block = file_storage.marshal.dumps([record], 4)
+        names = file_storage.marshal.dumps(list(file_storage.tags), 4)
+        length = file_storage.block_length.pack
+        data = (file_storage.magic + b"\x01" + length(len(names)) + names +
+                length(len(block)) + block + length(0))
+        pairs = list(file_storage.iter_binary_object(io.BytesIO(data)))
+        self.assertEqual(pairs, [("Amenity.1", {
+            "name": "a", "id": "1", "__class__": "Amenity"})])
+
+    def test_invalid(self):
+        """Test that other versions and truncated snapshots raise
+        ValueError"""
+        f = io.BytesIO()
+        file_storage.write_binary_object(f, [(0, "1", {"name": "a"})])
+        data = f.getvalue()
+        for data in [data[:-1], data[:4] + b"\x09" + data[5:],
+                     data[:5] + b"\x7f" + data[6:], b"{}"]:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    list(file_storage.iter_binary_object(io.BytesIO(data)))
+
+
 class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
+    def setUp(self):
+        """Points models.storage, which the models call on changes, at
+        FileStorage when another engine than the database is selected"""
+        if models.storage_t != 'db' and \
+                not isinstance(models.storage, FileStorage):
+            patcher = mock.patch.object(models, "storage", FileStorage())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_all_returns_dict(self):
         """Test that all returns the FileStorage.__objects attr"""
@@ -113,3 +210,545 @@ class TestFileStorage(unittest.TestCase):
         with open("file.json", "r") as f:
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get(self):
+        """Test that get returns the object with the matching class and id"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        self.assertIs(storage.get(State, state.id), state)
+        self.assertIsNone(storage.get(City, state.id))
+        self.assertIsNone(storage.get(State, "missing"))
+        storage.delete(state)
+        self.assertIsNone(storage.get(State, state.id))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_cls_and_count(self):
+        """Test that all(cls) and count(cls) follow new and delete"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        states = [State(), State()]
+        city = City()
+        for obj in states + [city]:
+            storage.new(obj)
+        self.assertEqual(storage.count(State), 2)
+        self.assertEqual(storage.count("City"), 1)
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(set(storage.all(State).values()), set(states))
+        self.assertEqual(storage.all("City"), {"City." + city.id: city})
+        storage.delete(states[0])
+        self.assertEqual(storage.count(State), 1)
+        self.assertNotIn("State." + states[0].id, storage.all(State))
+        FileStorage._FileStorage__objects = save
+        self.assertNotIn("City." + city.id, storage.all(City))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_skips_unchanged_file(self):
+        """Test that close only re-reads file.json after it changed"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        storage.save()
+        with mock.patch.object(file_storage.json, "load") as load:
+            storage.close()
+            self.assertFalse(load.called)
+        with open("file.json", "r") as f:
+            jo = json.load(f)
+        jo["State." + state.id]["name"] = "Changed"
+        with open("file.json", "w") as f:
+            json.dump(jo, f, indent=1)
+        storage.close()
+        self.assertEqual(storage.get(State, state.id).name, "Changed")
+        storage.delete(storage.get(State, state.id))
+
+    def isolate(self, **attrs):
+        """Points FileStorage at an empty store in a temporary directory,
+        restoring the previous state when the test ends"""
+        tmp = tempfile.mkdtemp()
+        attrs.setdefault("objects", {})
+        attrs.setdefault("file_path", os.path.join(tmp, "file.json"))
+        attrs.setdefault("stamp", None)
+        attrs.setdefault("pending", {})
+        attrs.setdefault("log_records", 0)
+        attrs.setdefault("records", {})
+        attrs.setdefault("format", "json")
+        for attr, value in attrs.items():
+            name = "_FileStorage__" + attr
+            self.addCleanup(setattr, FileStorage, name,
+                            getattr(FileStorage, name))
+            setattr(FileStorage, name, value)
+        self.addCleanup(shutil.rmtree, tmp)
+        return attrs["file_path"]
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_page(self):
+        """Test that all pages through a class in (created_at, id) order"""
+        storage = FileStorage()
+        self.isolate()
+        now = datetime(2017, 9, 28, 21, 3, 54, 52298)
+        states = [State(created_at=(now + timedelta(i // 2)).isoformat())
+                  for i in range(5)]
+        for state in reversed(states):
+            storage.new(state)
+        states.sort(key=lambda state: (state.created_at, state.id))
+
+        def page(limit=None, after=None):
+            return list(storage.all(State, limit=limit,
+                                    after=after).values())
+        self.assertEqual(page(2), states[:2])
+        cursor = (states[1].created_at, states[1].id)
+        self.assertEqual(page(2, cursor), states[2:4])
+        self.assertEqual(page(after=cursor), states[2:])
+        storage.delete(states[2])
+        late = State(created_at=(now + timedelta(9)).isoformat())
+        storage.new(late)
+        self.assertEqual(page(after=cursor), states[3:] + [late])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_page_update(self):
+        """Test that updates keep the order of a class, only moving an
+        object whose created_at changed"""
+        storage = FileStorage()
+        self.isolate()
+        now = datetime(2017, 9, 28, 21, 3, 54, 52298)
+        states = [State(created_at=now + timedelta(i)) for i in range(4)]
+        storage.new_many(states)
+        self.assertEqual(list(storage.all(State, limit=4).values()), states)
+        order = storage._FileStorage__order["State"]
+        with mock.patch.object(storage, "_FileStorage__peek") as peek:
+            states[1].name = "Nevada"
+            states[1].save()
+            storage.new(states[2])
+            self.assertEqual(list(storage.all(State, limit=4).values()),
+                             states)
+            states[0].created_at = now + timedelta(9)
+            self.assertEqual(list(storage.all(State, limit=4).values()),
+                             states[1:] + states[:1])
+            self.assertFalse(peek.called)
+        self.assertIs(storage._FileStorage__order["State"], order)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_page_lazy(self):
+        """Test that a page builds only its own records"""
+        storage = FileStorage()
+        self.isolate(compact=True)
+        states = [State() for i in range(4)]
+        for state in states:
+            storage.new(state)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        storage.reload()
+        states.sort(key=lambda state: (state.created_at, state.id))
+        cursor = (states[0].created_at, states[0].id)
+        page = storage.all(State, limit=2, after=cursor)
+        self.assertEqual([state.id for state in page.values()],
+                         [state.id for state in states[1:3]])
+        self.assertEqual(set(storage._FileStorage__objects), set(page))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_iter(self):
+        """Test that iter filters, pages and builds records as it goes"""
+        storage = FileStorage()
+        self.isolate(lazy=True)
+        ca, nv = State(), State()
+        cities = [City(state_id=ca.id, name=str(i % 2)) for i in range(4)]
+        for obj in [ca, nv, City(state_id=nv.id)] + cities:
+            storage.new(obj)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        storage.reload()
+        objects = storage._FileStorage__objects
+        cities.sort(key=lambda city: (city.created_at, city.id))
+        ids = [city.id for city in cities]
+        found = storage.iter(City, where={"state_id": ca.id})
+        self.assertEqual(len(objects), 0)
+        next(found)
+        self.assertEqual(len(objects), 1)
+        self.assertCountEqual([city.id for city in found], ids[1:])
+        found = storage.iter("City", where={"state_id": ca.id, "name": "1"})
+        self.assertCountEqual([city.id for city in found], ids[1::2])
+        found = storage.iter(City, limit=2, where={"state_id": ca.id},
+                             after=(cities[0].created_at, cities[0].id))
+        self.assertEqual([city.id for city in found], ids[1:3])
+        self.assertEqual(len(list(storage.iter(State))), 2)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_generation(self):
+        """Test that generation grows with every change to a class"""
+        storage = FileStorage()
+        self.isolate(generations={})
+        state = State()
+        storage.new(state)
+        self.assertEqual(storage.generation(State), 1)
+        state.name = "CA"
+        self.assertEqual(storage.generation("State"), 2)
+        storage.new(City())
+        self.assertEqual(storage.generation(City), 1)
+        self.assertEqual(storage.generation(), 3)
+        storage.get(State, state.id).to_dict()
+        storage.delete(state)
+        self.assertEqual(storage.generation(State), 3)
+        self.assertEqual(storage.generation(Review), 0)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_new_many_delete_many(self):
+        """Test that new_many and delete_many need a single save"""
+        storage = FileStorage()
+        path = self.isolate()
+        states = [State() for i in range(3)]
+        storage.new_many(states)
+        storage.save()
+        with open(path) as f:
+            self.assertEqual(len(json.load(f)), 3)
+        storage.delete_many(states[:2])
+        self.assertEqual(list(storage.all(State).values()), states[2:])
+        storage.save()
+        with open(path) as f:
+            self.assertEqual(list(json.load(f)), ["State." + states[2].id])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_bulk_insert(self):
+        """Test that bulk_insert indexes objects built from the rows"""
+        storage = FileStorage()
+        path = self.isolate()
+        self.assertEqual(storage.bulk_insert(City, [
+            {"state_id": "s", "name": str(i)} for i in range(3)]), 3)
+        self.assertEqual(storage.count(City), 3)
+        self.assertEqual(len(storage.related(City, "state_id", "s")), 3)
+        self.assertEqual(sorted(city.name for city in
+                                storage.iter(City, limit=5)),
+                         ["0", "1", "2"])
+        storage.save()
+        with open(path) as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_journal(self):
+        """Test that save appends to the log and compacts past the limit"""
+        storage = FileStorage()
+        path = self.isolate(journal=2)
+        s1, s2, s3 = State(), State(), State()
+        storage.new(s1)
+        storage.save()
+        self.assertFalse(os.path.exists(path + ".log"))
+        size = os.path.getsize(path)
+        storage.new(s2)
+        storage.save()
+        storage.delete(s1)
+        storage.save()
+        self.assertEqual(os.path.getsize(path), size)
+        with open(path + ".log", "r") as f:
+            self.assertEqual(len(f.readlines()), 2)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        storage.reload()
+        self.assertEqual(list(storage.all()), ["State." + s2.id])
+        storage.new(s3)
+        storage.save()
+        self.assertFalse(os.path.exists(path + ".log"))
+        with open(path, "r") as f:
+            self.assertEqual(set(json.load(f)),
+                             {"State." + s2.id, "State." + s3.id})
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_concurrent_save(self):
+        """Test that threads saving at the same time each write a whole
+        snapshot"""
+        storage = FileStorage()
+        path = self.isolate()
+        states = [State(name=str(i)) for i in range(500)]
+        storage.new_many(states)
+        errors = []
+
+        def save():
+            """saves the storage a few times, noting any error"""
+            try:
+                for i in range(10):
+                    storage.save()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=save) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with open(path) as f:
+            self.assertEqual(len(json.load(f)), len(states))
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["file.json"])
+        self.assertEqual(os.stat(path).st_mode & 0o777,
+                         file_storage.file_mode)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_journal_torn(self):
+        """Test that a torn append to the log only loses its own record"""
+        storage = FileStorage()
+        path = self.isolate(journal=10)
+
+        def restart():
+            """forgets the objects in memory and reloads them"""
+            FileStorage._FileStorage__objects = {}
+            FileStorage._FileStorage__stamp = None
+            storage.reload()
+        for name in ("a", "b"):
+            storage.new(State(name=name))
+            storage.save()
+        with open(path + ".log", "a") as f:
+            f.write('{"key": "State.c", "value": {"na')
+        for name in ("d", "e"):
+            restart()
+            storage.new(State(name=name))
+            storage.save()
+        restart()
+        self.assertEqual(sorted(state.name for state in
+                                storage.all(State).values()),
+                         ["a", "b", "d", "e"])
+        with open(path + ".log", "r") as f:
+            lines = f.readlines()
+        self.assertEqual(FileStorage._FileStorage__log_records, len(lines))
+        self.assertEqual(len(lines), 4)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_only_serializes_modified(self):
+        """Test that save reuses the serialized form of unchanged objects"""
+        storage = FileStorage()
+        path = self.isolate()
+        state = State(name="California")
+        city = City(name="Fremont")
+        storage.new(state)
+        storage.new(city)
+        storage.save()
+        state.name = "Nevada"
+        with mock.patch.object(City, "to_dict",
+                               side_effect=AssertionError):
+            storage.save()
+        with open(path, "r") as f:
+            jo = json.load(f)
+        self.assertEqual(jo["State." + state.id]["name"], "Nevada")
+        self.assertEqual(jo["City." + city.id], city.to_dict())
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_is_atomic(self):
+        """Test that a failed save leaves the previous file.json intact"""
+        storage = FileStorage()
+        path = self.isolate(durability="dir")
+        state = State()
+        storage.new(state)
+        with mock.patch.object(file_storage.os, "fsync",
+                               wraps=os.fsync) as fsync:
+            storage.save()
+            self.assertEqual(fsync.call_count, 2)
+        with open(path, "r") as f:
+            before = f.read()
+        storage.new(State())
+        with mock.patch.object(file_storage.os, "replace",
+                               side_effect=OSError):
+            self.assertRaises(OSError, storage.save)
+        with open(path, "r") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["file.json"])
+
+    def check_lazy_reload(self, **attrs):
+        """Checks that reload only builds objects once accessed"""
+        storage = FileStorage()
+        path = self.isolate(**attrs)
+        state = State(name="California")
+        cities = [City(name="Fremont"), City(name="Oakland")]
+        for obj in [state] + cities:
+            storage.new(obj)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        storage.reload()
+        self.assertEqual(storage._FileStorage__objects, {})
+        self.assertEqual(storage.count(State), 1)
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.get(State, state.id).name, "California")
+        self.assertEqual(list(storage._FileStorage__objects),
+                         ["State." + state.id])
+        self.assertEqual(sorted(c.name for c in storage.all(City).values()),
+                         ["Fremont", "Oakland"])
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        storage.reload()
+        storage.save()
+        with open(path, "r") as f:
+            self.assertEqual(json.load(f)["City." + cities[0].id],
+                             cities[0].to_dict())
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_binary_format(self):
+        """Test that a binary snapshot reloads, in any mode, and converts
+        back to JSON"""
+        storage = FileStorage()
+        path = self.isolate(format="binary", lazy=False, compact=False)
+        state = State(name="California")
+        place = Place(city_id="c", name="Loft", amenity_ids=["a"])
+        storage.new_many([state, place])
+        storage.save()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(4), b"HBNB")
+        for mode in ("lazy", "compact", None):
+            with self.subTest(mode=mode):
+                FileStorage._FileStorage__objects = {}
+                FileStorage._FileStorage__records = {}
+                FileStorage._FileStorage__stamp = None
+                FileStorage._FileStorage__lazy = mode == "lazy"
+                FileStorage._FileStorage__compact = mode == "compact"
+                storage.reload()
+                self.assertEqual(storage.get(Place, place.id).to_dict(),
+                                 place.to_dict())
+                storage.save()
+        FileStorage._FileStorage__format = "json"
+        storage.save()
+        with open(path) as f:
+            self.assertEqual(json.load(f)["State." + state.id],
+                             state.to_dict())
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_unreadable(self):
+        """Test that a snapshot that cannot be read raises rather than
+        reloading as an empty store"""
+        storage = FileStorage()
+        path = self.isolate(format="binary", lazy=False, compact=False)
+        storage.new(State(name="California"))
+        storage.save()
+        with open(path, "r+b") as f:
+            f.seek(5)
+            f.write(b"\x7f")
+        FileStorage._FileStorage__stamp = None
+        with self.assertRaises(ValueError):
+            storage.reload()
+        os.remove(path)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.all(), {})
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_lazy_reload(self):
+        """Test that lazy reload only builds objects once accessed"""
+        self.check_lazy_reload(lazy=True)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_compact_reload(self):
+        """Test that compact reload only builds objects once accessed"""
+        self.check_lazy_reload(compact=True)
+
+
+class TestCompactRecords(unittest.TestCase):
+    """Test the CompactRecords class"""
+    def test_round_trip(self):
+        """Test that records come back as the dicts stored"""
+        records = file_storage.CompactRecords("Review")
+        reviews = [Review(place_id="p" * 3, user_id="u", text=str(i))
+                   for i in range(3)]
+        for review in reviews:
+            records["Review." + review.id] = review.to_dict()
+        self.assertEqual(len(records), 3)
+        self.assertEqual(list(records),
+                         ["Review." + review.id for review in reviews])
+        self.assertEqual(dict(records.items()),
+                         {"Review." + review.id: review.to_dict()
+                          for review in reviews})
+        self.assertEqual(records.pop("Review." + reviews[0].id),
+                         reviews[0].to_dict())
+        self.assertIsNone(records.pop("Review." + reviews[0].id))
+        self.assertEqual(len(records), 2)
+
+    def test_shared_values(self):
+        """Test that attribute names and foreign keys are shared"""
+        records = file_storage.CompactRecords("City")
+        for i in range(2):
+            records["City." + str(i)] = {
+                "id": str(i), "__class__": "City", "name": "n",
+                "state_id": "".join(["state", "1"])}
+        first, second = records._CompactRecords__rows.values()
+        self.assertIs(first[0], second[0])
+        self.assertIs(first[2], second[2])
+
+
+class TestFileStorageRelations(unittest.TestCase):
+    """Test the foreign key index of FileStorage"""
+    setUp = TestFileStorage.setUp
+    isolate = TestFileStorage.isolate
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_related(self):
+        """Test that related follows new, attribute changes and delete"""
+        storage = FileStorage()
+        self.isolate()
+        ca, nv = State(), State()
+        sf, la = City(state_id=ca.id), City(state_id=ca.id)
+        for obj in [ca, nv, sf, la]:
+            storage.new(obj)
+        self.assertEqual(storage.related(City, "state_id", ca.id), [sf, la])
+        self.assertEqual(ca.cities, [sf, la])
+        la.state_id = nv.id
+        self.assertEqual(ca.cities, [sf])
+        self.assertEqual(nv.cities, [la])
+        storage.delete(sf)
+        self.assertEqual(ca.cities, [])
+        self.assertEqual(storage.related(City, "name", la.name), [la])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_related_lazy(self):
+        """Test that related builds only the records it returns"""
+        storage = FileStorage()
+        self.isolate(lazy=True)
+        place, other = Place(), Place()
+        reviews = [Review(place_id=place.id), Review(place_id=other.id)]
+        for obj in [place, other] + reviews:
+            storage.new(obj)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__stamp = None
+        storage.reload()
+        place = storage.get(Place, place.id)
+        self.assertEqual([r.id for r in place.reviews], [reviews[0].id])
+        self.assertEqual(storage.count(Review), 2)
+        self.assertNotIn("Review." + reviews[1].id,
+                         storage._FileStorage__objects)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_search_places(self):
+        """Test search_places filters by state, city and amenities"""
+        storage = FileStorage()
+        self.isolate()
+        ca, nv = State(), State()
+        sf, la = City(state_id=ca.id), City(state_id=ca.id)
+        reno = City(state_id=nv.id)
+        home, flat, cabin = (Place(city_id=sf.id), Place(city_id=la.id),
+                             Place(city_id=reno.id))
+        wifi, pool = Amenity(), Amenity()
+        for obj in [ca, nv, sf, la, reno, home, flat, cabin, wifi, pool]:
+            storage.new(obj)
+        home.amenities = wifi
+        home.amenities = pool
+        flat.amenities = wifi
+        search = storage.search_places
+        self.assertCountEqual(search(), [home, flat, cabin])
+        self.assertCountEqual(search([ca.id]), [home, flat])
+        self.assertCountEqual(search([ca.id], [sf.id, reno.id]),
+                              [home, flat, cabin])
+        self.assertCountEqual(search([], [la.id]), [flat])
+        self.assertCountEqual(search([ca.id], [], [wifi.id]), [home, flat])
+        self.assertCountEqual(search([], [], [wifi.id, pool.id]), [home])
+        self.assertCountEqual(search([nv.id], [], ["missing"]), [cabin])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_place_amenities(self):
+        """Test that Place.amenities follows amenity_ids"""
+        storage = FileStorage()
+        self.isolate()
+        place, wifi = Place(), Amenity(name="Wifi")
+        storage.new(place)
+        storage.new(wifi)
+        place.amenities = wifi
+        place.amenities = wifi
+        self.assertEqual(place.amenity_ids, [wifi.id])
+        self.assertEqual(Place.amenity_ids, [])
+        self.assertEqual(place.amenities, [wifi])
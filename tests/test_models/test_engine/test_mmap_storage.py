@@ -0,0 +1,245 @@
+#!/usr/bin/python3
+"""
+Contains the TestMmapStorageDocs and TestMmapStorage classes
+"""
+
+from datetime import datetime, timedelta
+import gc
+import inspect
+import models
+from models.engine import mmap_storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+import os
+import pep8
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import weakref
+MmapStorage = mmap_storage.MmapStorage
+
+
+class TestMmapStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of MmapStorage class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.ms_f = inspect.getmembers(MmapStorage, inspect.isfunction)
+        cls.ms_f += inspect.getmembers(mmap_storage.Segment,
+                                       inspect.isfunction)
+
+    def test_pep8_conformance_mmap_storage(self):
+        """Test that models/engine/mmap_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/mmap_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_mmap_storage(self):
+        """Test tests/test_models/test_mmap_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_mmap_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_mmap_storage_module_docstring(self):
+        """Test for the mmap_storage.py module docstring"""
+        self.assertIsNot(mmap_storage.__doc__, None,
+                         "mmap_storage.py needs a docstring")
+        self.assertTrue(len(mmap_storage.__doc__) >= 1,
+                        "mmap_storage.py needs a docstring")
+
+    def test_mmap_storage_class_docstring(self):
+        """Test for the MmapStorage class docstring"""
+        self.assertIsNot(MmapStorage.__doc__, None,
+                         "MmapStorage class needs a docstring")
+        self.assertTrue(len(MmapStorage.__doc__) >= 1,
+                        "MmapStorage class needs a docstring")
+
+    def test_ms_func_docstrings(self):
+        """Test for the presence of docstrings in MmapStorage methods"""
+        for func in self.ms_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing mmap storage")
+class TestMmapStorage(unittest.TestCase):
+    """Test the MmapStorage class"""
+    def setUp(self):
+        """Points MmapStorage at an empty data file in a temporary
+        directory, restoring the previous state when the test ends"""
+        tmp = tempfile.mkdtemp()
+        self.path = os.path.join(tmp, "file.mmap")
+        attrs = {"file_path": self.path, "map": None, "segments": {},
+                 "stamp": None, "pending": {}, "generations": {},
+                 "objects": weakref.WeakValueDictionary()}
+        for attr, value in attrs.items():
+            name = "_MmapStorage__" + attr
+            self.addCleanup(setattr, MmapStorage, name,
+                            getattr(MmapStorage, name))
+            setattr(MmapStorage, name, value)
+        self.addCleanup(shutil.rmtree, tmp)
+        self.storage = MmapStorage()
+
+    def remap(self):
+        """forgets the objects in memory and maps the data file again"""
+        MmapStorage._MmapStorage__objects = weakref.WeakValueDictionary()
+        MmapStorage._MmapStorage__stamp = None
+        self.storage.reload()
+
+    def test_get_decodes_one_record(self):
+        """Test that get only decodes the record of the object"""
+        states = [State(name=str(i)) for i in range(50)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.remap()
+        with mock.patch.object(mmap_storage.marshal, "loads",
+                               wraps=mmap_storage.marshal.loads) as loads:
+            state = self.storage.get(State, states[7].id)
+            self.assertEqual(loads.call_count, 1)
+        self.assertEqual(state.to_dict(), states[7].to_dict())
+        self.assertIs(self.storage.get(State, states[7].id), state)
+        self.assertIsNone(self.storage.get(State, "missing"))
+        self.assertIsNone(self.storage.get(City, states[7].id))
+
+    def test_save_during_iteration(self):
+        """Test that an iteration goes on over the data file it started
+        on when a save() maps a new one"""
+        states = [State(name=str(i)) for i in range(5)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.remap()
+        states.sort(key=lambda state: (state.created_at, state.id))
+        ids = [state.id for state in states]
+        names = {state.id: state.name for state in states}
+        for collect in (False, True):
+            with self.subTest(collect=collect):
+                found = self.storage.iter(State)
+                first = next(found)
+                self.storage.delete(self.storage.get(State, ids[1]))
+                self.storage.save()
+                if collect:
+                    gc.collect()
+                rest = list(found)
+                self.assertEqual([first.id] + [s.id for s in rest], ids)
+                for state in [first] + rest:
+                    self.assertEqual(state.name, names[state.id])
+                self.assertIsNone(self.storage.get(State, ids[1]))
+                self.assertEqual(self.storage.count(State), 4)
+                self.storage.new(states[1])
+                self.storage.save()
+                self.remap()
+
+    def test_marshal_version(self):
+        """Test that the data file records the marshal version of its
+        records"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(6), mmap_storage.magic + bytes(
+                [mmap_storage.version, mmap_storage.marshal_version]))
+
+    def test_all_page(self):
+        """Test that all pages through stored and unsaved objects in
+        (created_at, id) order"""
+        now = datetime(2017, 9, 28, 21, 3, 54, 52298)
+        states = [State(name=str(i), created_at=now + timedelta(i // 2))
+                  for i in range(6)]
+        self.storage.new_many(states[::2])
+        self.storage.save()
+        self.remap()
+        self.storage.new_many(states[1::2])
+        states.sort(key=lambda state: (state.created_at, state.id))
+
+        def page(limit=None, after=None):
+            return [state.name for state in self.storage.all(
+                State, limit=limit, after=after).values()]
+        names = [state.name for state in states]
+        self.assertEqual(page(), names)
+        self.assertEqual(page(limit=4), names[:4])
+        after = (states[2].created_at, states[2].id)
+        self.assertEqual(page(limit=2, after=after), names[3:5])
+        self.storage.save()
+        self.remap()
+        self.assertEqual(page(after=after), names[3:])
+
+    def test_delete_count(self):
+        """Test that count follows deletions before and after save"""
+        states = [State(name=str(i)) for i in range(3)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.assertEqual(self.storage.count(State), 3)
+        self.storage.delete(states[0])
+        self.storage.delete(states[0])
+        self.storage.new(State(name="new"))
+        self.assertEqual(self.storage.count(State), 3)
+        self.assertIsNone(self.storage.get(State, states[0].id))
+        self.storage.save()
+        self.remap()
+        self.assertEqual(self.storage.count(), 3)
+        self.assertIsNone(self.storage.get(State, states[0].id))
+
+    def test_touch(self):
+        """Test that a stored object changed in place is saved"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        generation = self.storage.generation(State)
+        state.name = "Nevada"
+        self.storage.touch(state)
+        self.assertGreater(self.storage.generation(State), generation)
+        self.storage.save()
+        self.remap()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+
+    def test_related_search_places(self):
+        """Test that children and places are found by their parents"""
+        state = State(name="California")
+        cities = [City(state_id=state.id, name=str(i)) for i in range(3)]
+        user = User(email="mmap@hbnb.io")
+        amenity = Amenity(name="Wifi")
+        places = [Place(city_id=cities[i % 2].id, user_id=user.id,
+                        name=str(i), amenity_ids=[amenity.id] * (i % 3))
+                  for i in range(6)]
+        self.storage.new_many([state, user, amenity] + cities + places)
+        self.storage.save()
+        self.remap()
+        self.assertEqual(sorted(city.name for city in self.storage.related(
+            City, "state_id", state.id)), ["0", "1", "2"])
+        self.storage.new(City(state_id=state.id, name="3"))
+        self.assertEqual(len(self.storage.related(City, "state_id",
+                                                  state.id)), 4)
+        found = self.storage.search_places(states=[state.id],
+                                           amenities=[amenity.id])
+        self.assertEqual(sorted(place.name for place in found),
+                         ["1", "2", "4", "5"])
+        found = self.storage.search_places(cities=[cities[1].id], limit=2)
+        self.assertEqual([place.name for place in found], ["1", "3"])
+
+    def test_reload_remaps_changed_file(self):
+        """Test that reload picks up a data file written by another
+        process, and only then"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        shutil.copy(self.path, self.path + ".old")
+        state.name = "Nevada"
+        self.storage.new(state)
+        self.storage.save()
+        generation = self.storage.generation()
+        self.storage.reload()
+        self.assertEqual(self.storage.generation(), generation)
+        os.replace(self.path + ".old", self.path)
+        del state
+        self.storage.reload()
+        self.assertGreater(self.storage.generation(), generation)
+        self.assertEqual(self.storage.all(State).popitem()[1].name,
+                         "California")